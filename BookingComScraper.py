@@ -1,197 +1,119 @@
 import os
-from playwright.async_api import async_playwright
+import logging
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
 import asyncio
-from anthropic import Anthropic
+from contextlib import asynccontextmanager
 import re
 import pandas as pd
 from dotenv import load_dotenv
 
+from ResultCache import ResultCache
+from ReviewFingerprints import FingerprintIndex, review_fingerprint
+from ReviewRecord import BASE_FIELDS, ReviewRecord, records_to_dataframe
+from ReviewSinks import CsvSink, ParquetSink, RecordCollector, check_csv_columns
+from ScrapeMetrics import ScrapeMetrics
+from ScrapeProfile import ScrapeProfile
+from SelectorRegistry import SelectorRegistry
+from SentimentClassifier import get_sentiment_backend
+
 class BookingComScraper:
 
     POSTGRES_URI = os.getenv('TEMBO_URI')
 
-    ANTHROPIC_API_KEY = os.getenv('ANTHROPIC_API_KEY')
-    TIMEOUT_LENGTH = 500
-    
-    def __init__(self):
-
-        load_dotenv()
-        
-    async def get_neg_pos_review(self, card):
-        # Extract positive review
-        positive_review_locator = card.locator('[data-testid="review-positive-text"] span')
-        positive_review_count = await positive_review_locator.count()
-
-        if positive_review_count > 1:
-            positive_review = await positive_review_locator.nth(1).text_content()  # Get the visible text
-        elif positive_review_count == 1:
-            positive_review = await positive_review_locator.first.text_content()
-        else:
-            positive_review = None  # If no positive review exists
-
-        # Extract negative review (same approach)
-        negative_review_locator = card.locator('[data-testid="review-negative-text"] span')
-        negative_review_count = await negative_review_locator.count()
-
-        if negative_review_count > 1:
-            negative_review = await negative_review_locator.nth(1).text_content()
-        elif negative_review_count == 1:
-            negative_review = await negative_review_locator.first.text_content()
-        else:
-            negative_review = None  # If no negative review exists
-
-        return positive_review, negative_review
-
-    async def get_score(self, card):
-        score_locator = card.locator('.a3b8729ab1.d86cee9b25')
-
-        # Get the full text and extract the last occurrence of the score
-        full_text = await score_locator.text_content()
-        
-        # Extract the numeric score (usually at the end of the text)
-        score = full_text.strip().split()[-1]  # This gets the last part (e.g., '8.0')
-
-        return score
-
-    async def get_reviewer_name(self, card):
-        name_locator = card.locator('.a3332d346a.e6208ee469')
-        
-        if await name_locator.count() > 0:  # Check if locator exists
-            reviewer_name = await name_locator.text_content()
-            return reviewer_name.strip()  # Store cleaned text
-        else:
-            return None  # Insert None if locator is missing
-
-    async def get_checkin_date(self, card):
-        date_locator = card.locator('[data-testid="review-stay-date"]')
-        
-        if await date_locator.count() > 0:  # Check if locator exists
-            stay_date = await date_locator.text_content()
-            return stay_date.strip()  # Store cleaned text
-        else:
-            return None  # Insert None if locator is missing
-
-    async def get_country(self, card):
-        country_locator = card.locator('span.afac1f68d9.a1ad95c055')
-
-        if await country_locator.count() > 0:  # Check if locator exists
-            country = await country_locator.text_content()
-            return country.strip()  # Store cleaned text
-        else:
-            return None  # Insert None if locator is missing
-    
-    async def get_apartment_type(self,card):
-        room_locator = card.locator('span[data-testid="review-room-name"]')
-
-        if await room_locator.count() > 0:  # Check if locator exists
-            room_name = await room_locator.text_content()
-            return room_name.strip()  # Store cleaned text
-        else:
-            return None  # Insert None if locator is missing
-    
-    async def get_length_of_stay(self, card):
-        nights_locator = card.locator('span[data-testid="review-num-nights"]')
-
-        if await nights_locator.count() > 0:  # Check if locator exists
-            num_nights_text = await nights_locator.text_content()
-            match = re.search(r'(\d+)', num_nights_text)  # Extract the number using regex
-            num_nights = int(match.group(1)) if match else None  # Convert to int if found
-        else:
-            num_nights = None  # Insert None if locator is missing
-
-        return num_nights
-
-    async def get_group_type(self, card):
-        traveler_locator = card.locator('span[data-testid="review-traveler-type"]')
-
-        if await traveler_locator.count() > 0:  # Check if locator exists
-            traveler_type = await traveler_locator.text_content()
-        else:
-            traveler_type = None  # Insert None if locator is missing
-
-        return traveler_type
-
-    async def get_partner_reply(self, card):
-
-        # Look for the "Continue reading" button inside the review card
-        continue_reading_button = card.locator('[data-testid="review-pr-toggle"]')
-
-        # Check if the button is visible
-        if await continue_reading_button.is_visible():
-            # Click to reveal the reply
-            await continue_reading_button.click()
-
-            # Wait for the reply text to appear, refine the locator to target the reply specifically
-            # reply_locator = card.locator('.a53cbfa6de.b5726afd0b span').nth(1)  # Use .nth(1) to target the second <span> (partner's reply)
-            reply_locator = card.locator('[data-testid="review-partner-reply"] .a53cbfa6de.b5726afd0b span')
-            await reply_locator.wait_for(timeout=self.TIMEOUT_LENGTH)  # Wait for the reply to appear (try commenting out this wait)
-
-            # Get the reply text
-            reply_text = await reply_locator.text_content()
+    # upper bound on how long to wait for the page to signal that it is ready (ms)
+    SIGNAL_TIMEOUT = 15000
+    MAX_REVIEW_PAGES = 50
+
+    # fields read from every review card, their selectors live in review_selectors.json
+    REVIEW_FIELDS = (
+        'positive_review', 'negative_review', 'review_rating', 'reviewer_name', 'reviewer_check_in_date',
+        'review_created_date', 'country', 'apartment_type', 'length_nights_stay', 'group_type', 'review_feedback',
+    )
+
+    # runs in the page: picks the first candidate selector per field that matches in any
+    # card, then returns the text of every match of that selector for every card
+    EXTRACT_REVIEW_CARDS_JS = """
+    (cards, [candidates, toggleName]) => {
+        const chosen = {};
+        for (const [name, selectors] of Object.entries(candidates)) {
+            chosen[name] = selectors.find(selector => cards.some(card => card.querySelector(selector))) || null;
+        }
+        const records = cards.map(card => {
+            const record = {};
+            for (const [name, selector] of Object.entries(chosen)) {
+                if (name === toggleName) continue;
+                record[name] = selector ? Array.from(card.querySelectorAll(selector), el => el.textContent) : [];
+            }
+            const toggle = chosen[toggleName] && card.querySelector(chosen[toggleName]);
+            record.has_partner_reply = !!toggle && toggle.getClientRects().length > 0;
+            return record;
+        });
+        return {records, chosen};
+    }
+    """
+
+    # runs in the page: the first candidate selector that matches anything, or null
+    FIRST_MATCHING_SELECTOR_JS = "selectors => selectors.find(selector => document.querySelector(selector)) || null"
+
+    # runs in the page: true once the first review card differs from the one shown before
+    # the click and, when the pagination marks an active page, that page is the target
+    REVIEW_LIST_CHANGED_JS = """
+    ([cardSelector, previousFirstCard, paginationSelector, pageLabel]) => {
+        const firstCard = document.querySelector(cardSelector);
+        if (!firstCard || firstCard.textContent === previousFirstCard) return false;
+        if (!pageLabel || !paginationSelector || !document.querySelector(`${paginationSelector} [aria-current]`)) return true;
+        return document.querySelector(`${paginationSelector} button[aria-label="${pageLabel}"][aria-current="page"]`) !== null;
+    }
+    """
+
+    # runs in the page: clicks the reply toggle of each listed card in one go
+    EXPAND_PARTNER_REPLIES_JS = """
+    ([cardSelector, toggleSelector, indices]) => {
+        const cards = document.querySelectorAll(cardSelector);
+        for (const i of indices) {
+            const toggle = cards[i] && cards[i].querySelector(toggleSelector);
+            if (toggle) toggle.click();
+        }
+    }
+    """
 
-            if reply_text:
-                return reply_text.strip()  # Return the reply text if found
-            else:
-                return None
-        else:
-            return None
+    # runs in the page: true once every listed card shows its reply
+    PARTNER_REPLIES_SHOWN_JS = """
+    ([cardSelector, replySelector, indices]) => {
+        const cards = document.querySelectorAll(cardSelector);
+        return indices.every(i => cards[i] && cards[i].querySelector(replySelector));
+    }
+    """
 
-    async def get_review_created_date(self, card):
-        # Look for the review date inside the review card
-        date_locator = card.locator('[data-testid="review-date"]')
+    # number of browser contexts the review pages are spread across
+    NUM_PAGE_WORKERS = 4
 
-        # Get the text content (e.g., "Reviewed: February 12, 2025")
-        date_text = await date_locator.text_content()
+    def __init__(self, sentiment_classifier=None, cache=None, fingerprint_index=None, metrics=None, profile=None, rate_limiter=None, translator=None, include_partner_replies=True, selectors=None):
 
-        if date_text:
-            # Extract the date value (e.g., "February 12, 2025")
-            review_date = date_text.replace("Reviewed: ", "").strip()
-            return review_date
-        else:
-            return None
+        load_dotenv()
 
-    
-    def query_claude(self, content: str, query: str) -> str:
-        """
-        Send a query to Claude API about specific content and get the response.
-        
-        Args:
-            content (str): The text content to analyze or reference
-            query (str): The question or instruction for Claude about the content
+        # sentiment results are cached on disk so re-scrapes don't pay for the same review twice
+        self.cache = cache or ResultCache()
+        self.fingerprint_index = fingerprint_index or FingerprintIndex()
+        self.metrics = metrics or ScrapeMetrics()
+        self.profile = profile or ScrapeProfile()
+        # selector fallbacks, the working choice per field is kept for the whole run
+        self.selectors = selectors or SelectorRegistry()
+        # optional DomainRateLimiter shared by every page that talks to the same site
+        self.rate_limiter = rate_limiter
+        # optional TranslationStage, run on each page before sentiment classification
+        self.translator = translator
+        # runs that don't need review_feedback can skip the partner replies entirely. The
+        # reply is part of a review's identity, so such runs can't skip known reviews,
+        # record fingerprints or load into the reviews table (see check_review_identity)
+        self.include_partner_replies = include_partner_replies
+        self.playwright = None
+        self.browser = None
+        # SENTIMENT_BACKEND=local classifies offline with the transformer model instead of Claude
+        self.sentiment_classifier = sentiment_classifier or get_sentiment_backend(
+            os.getenv('SENTIMENT_BACKEND', 'claude'), api_key=os.getenv('ANTHROPIC_API_KEY'), cache=self.cache, metrics=self.metrics
+        )
         
-        Returns:
-            str: Claude's response
-            
-        Raises:
-            Exception: If API call fails or authentication error occurs
-        """
-        try:
-            # Initialize Anthropic client
-            client = Anthropic(api_key=self.ANTHROPIC_API_KEY)
-            
-            # Construct the message
-            system_prompt = "You are Claude, an AI assistant. Please analyze the following content and answer the query about it."
-            full_prompt = f"{system_prompt}\n\nContent:\n{content}\n\nQuery:\n{query}"
-            
-            # Call Claude API
-            message = client.messages.create(
-                model="claude-3-opus-20240229",
-                max_tokens=1000,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": full_prompt
-                    }
-                ]
-            )
-            
-            # Extract and return Claude's response
-            return message.content[0].text
-            
-        except Exception as e:
-            print(f"Error querying Claude API: {e}")
-            raise
-
     def create_review_dataframe(self, hotel_id, hotel_name, source_name, positive_review_text_array, negative_review_text_array, review_rating, reviewer_names, reviewer_country, review_sentiment, review_checkin_dates, review_created_date, apartment_type, num_nights_stay, group_type, review_feedback, review_texts):
         # Create a dictionary with each array as a key-value pair
         data = {
@@ -219,233 +141,624 @@ class BookingComScraper:
         
         return df
 
-    def save_to_csv(self, filename, df):
+    def resolve_write_mode(self, filename, if_exists='prompt'):
+        """
+        Decide how to write an output file that may already exist.
+
+        Args:
+            filename (str): Output file
+            if_exists (str): 'prompt' asks on stdin, 'overwrite', 'append', 'skip' or 'error'
+                decide without asking, for unattended runs
+
+        Returns:
+            str: 'overwrite' or 'append', or None when the file should be left alone
+        """
         # Check if the file already exists
-        if os.path.exists(filename):
+        if not os.path.exists(filename):
+            return 'overwrite'
+
+        if if_exists == 'prompt':
             # Prompt the user for confirmation
             user_input = input(f"The file '{filename}' already exists. Do you want to overwrite it? (y/n): ").strip().lower()
+            return 'overwrite' if user_input == 'y' else None
+        if if_exists in ('overwrite', 'append'):
+            return if_exists
+        if if_exists == 'skip':
+            return None
+        if if_exists == 'error':
+            raise FileExistsError(f"The file '{filename}' already exists")
 
-            # If the user confirms, save the dataframe as CSV
-            if user_input == 'y':
-                df.to_csv(filename, index=False)
-                print(f"Review data saved to '{filename}'")
-            else:
-                print("File not overwritten. Review data not saved.")
+        raise ValueError(f"Unknown if_exists option: {if_exists}")
+
+    def save_to_csv(self, filename, df, if_exists='prompt'):
+        write_mode = self.resolve_write_mode(filename, if_exists)
+
+        if write_mode is None:
+            self.metrics.event('save_skipped', filename=filename)
+            return
+
+        # append without repeating the header, to a file with the same columns
+        if write_mode == 'append':
+            check_csv_columns(filename, df.columns)
+            df.to_csv(filename, mode='a', header=False, index=False)
         else:
-            # If the file doesn't exist, save the dataframe as CSV
             df.to_csv(filename, index=False)
-            print(f"Review data saved to '{filename}'")
-        
-    def get_sentiment(self, text, query):
-            
+        self.metrics.event('saved', filename=filename, rows=len(df), mode=write_mode)
+
+    async def throttle(self, url):
+        # wait for the site's politeness limit before anything that hits the server
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire(url)
+
+    async def open_review_list(self, page, url_link):
+        # load the hotel page and open the reviews panel
+        await self.throttle(url_link)
+        with self.metrics.time_step('load_hotel_page'):
+            await page.goto(url_link, wait_until='domcontentloaded')
+
+        # click on see reviews button, then wait for the first review card to render
+        with self.metrics.time_step('open_review_list'):
+            await page.locator(self.selectors.selector('read_all_reviews')).first.click()
+            await page.locator(self.selectors.selector('review_card')).first.wait_for(timeout=self.SIGNAL_TIMEOUT)
+
+        await self.resolve_page_selector(page, 'read_all_reviews')
+        await self.resolve_page_selector(page, 'review_card')
+
+    async def resolve_page_selector(self, page, name):
+        # the first candidate present on the page, kept for the rest of the run (None if none match)
+        if name not in self.selectors.chosen:
+            selector = await page.evaluate(self.FIRST_MATCHING_SELECTOR_JS, self.selectors.candidates(name))
+            self.remember_selectors({name: selector})
+        return self.selectors.chosen.get(name)
+
+    def remember_selectors(self, choices):
+        for name, (selector, is_fallback) in self.selectors.remember(choices).items():
+            if is_fallback:
+                self.metrics.increment('selector_fallbacks', element=name)
+            self.metrics.event('selector_chosen', level=logging.WARNING if is_fallback else logging.DEBUG,
+                               element=name, selector=selector, fallback=is_fallback, registry=self.selectors.fingerprint)
+
+    async def get_first_card_text(self, page):
+        first_card = page.locator(self.selectors.selector('review_card')).first
+        if await first_card.count() == 0:
+            return None
+        return await first_card.text_content()
+
+    async def wait_for_review_list_change(self, page, previous_first_card, page_num=None):
+        # wait for the review list to be swapped out instead of sleeping a fixed time
+        page_label = f" {page_num}" if page_num is not None else None
+        await page.wait_for_function(
+            self.REVIEW_LIST_CHANGED_JS,
+            arg=[self.selectors.selector('review_card'), previous_first_card, self.selectors.chosen.get('pagination'), page_label],
+            timeout=self.SIGNAL_TIMEOUT
+        )
+
+    async def get_last_review_page(self, page):
+        # Locate the last <li> element of the pagination list
+        pagination = await self.resolve_page_selector(page, 'pagination')
+        if pagination is None:
+            # hotels with a single page of reviews have no pagination; if every hotel logs
+            # this, the pagination selectors have stopped matching
+            self.metrics.increment('selector_misses', element='pagination')
+            self.metrics.event('selector_missing', level=logging.WARNING, element='pagination', url=page.url,
+                               candidates=self.selectors.candidates('pagination'), assumed_pages=1)
+            return 1
+
+        last_review_page_num = await page.locator(f'{pagination} > li:last-child').first.text_content()
+        return int(last_review_page_num)
+
+    async def go_to_review_page(self, page, current_page, target_page):
+        # The pagination only renders buttons close to the current page, so keep
+        # jumping to the furthest visible page number that does not pass the target
+        while current_page != target_page:
+            pagination = await self.resolve_page_selector(page, 'pagination')
+            visible_pages = await page.locator(f'{pagination} > li button[aria-label]').evaluate_all(
+                "buttons => buttons.map(b => parseInt(b.getAttribute('aria-label'), 10)).filter(n => !isNaN(n))"
+            )
+            reachable = [n for n in visible_pages if current_page < n <= target_page]
+
+            if not reachable:
+                raise Exception(f"Could not reach review page {target_page} from page {current_page}")
+
+            next_page = max(reachable)
+            previous_first_card = await self.get_first_card_text(page)
+
+            # click button where aria-label = next_page
+            await self.throttle(page.url)
+            with self.metrics.time_step('navigate_page'):
+                await page.locator(f'button[aria-label=" {next_page}"]').click()
+                await self.wait_for_review_list_change(page, previous_first_card, next_page)
+            current_page = next_page
+
+        return current_page
+
+    def add_review_text(self, review):
+        # combined text that is handed to the sentiment classifier
+        positive_review = review['positive_review']
+        negative_review = review['negative_review']
+
+        # check if there was any review
+        if positive_review or negative_review:
+            review['review_text'] = "Positive: " + str(positive_review) + " negative: " + str(negative_review)
+        else:
+            review['review_text'] = None
+        review['sentiment'] = None
+
+        return review
+
+    async def classify_reviews(self, reviews):
+        ###################################################################
+        ##################### REVIEWER SENTIMENT ##########################
+        ###################################################################
+        sentiments = await self.sentiment_classifier.classify([review['review_text'] for review in reviews])
+
+        for review, sentiment in zip(reviews, sentiments):
+            review['sentiment'] = sentiment
+
+        return reviews
+
+    async def translate_reviews(self, reviews):
+        # translate non-English review texts, keeping the original next to the translation
+        translations, languages = await self.translator.translate_texts([review['review_text'] for review in reviews])
+
+        for review, translation, language in zip(reviews, translations, languages):
+            review['review_text_original'] = review['review_text']
+            review['review_text'] = translation
+            review['review_language'] = language
+
+        return reviews
+
+    def count_missing_fields(self, reviews):
+        # an empty field on every card usually means its selector no longer matches
+        for field in self.REVIEW_FIELDS:
+            if field == 'review_feedback' and not self.include_partner_replies:
+                continue
+            missing = sum(1 for review in reviews if review.get(field) is None)
+            if missing:
+                self.metrics.increment('missing_fields', missing, field=field)
+
+    def parse_review_fields(self, raw):
+        # Turn the raw text lists returned by the in-page extraction into field values:
+        # the visible review texts, stripped labels, the score and the number of nights
+        def first(field):
+            texts = raw.get(field)
+            return texts[0] if texts else None
+
+        def stripped(field):
+            text = first(field)
+            return text.strip() if text is not None else None
+
+        def visible_text(field):
+            # review texts have a hidden label span followed by the visible text
+            texts = raw.get(field) or []
+            if len(texts) > 1:
+                return texts[1]
+            return texts[0] if texts else None
+
+        def score():
+            score_text = first('review_rating')
+            return score_text.strip().split()[-1] if score_text and score_text.strip() else None
+
+        def created_date():
+            created_text = first('review_created_date')
+            return created_text.replace("Reviewed: ", "").strip() if created_text else None
+
+        def nights():
+            nights_match = re.search(r'(\d+)', first('length_nights_stay') or '')
+            return int(nights_match.group(1)) if nights_match else None
+
+        parsers = {
+            'positive_review': lambda: visible_text('positive_review'),
+            'negative_review': lambda: visible_text('negative_review'),
+            'review_rating': score,
+            'reviewer_name': lambda: stripped('reviewer_name'),
+            'reviewer_check_in_date': lambda: stripped('reviewer_check_in_date'),
+            'review_created_date': created_date,
+            'country': lambda: stripped('country'),
+            'apartment_type': lambda: stripped('apartment_type'),
+            'length_nights_stay': nights,
+            'group_type': lambda: first('group_type'),
+            'review_feedback': lambda: stripped('review_feedback') or None,
+        }
+
+        # a field that fails to parse is left empty instead of losing the whole page
+        review = {}
+        for field, parse in parsers.items():
+            try:
+                review[field] = parse()
+            except Exception as e:
+                self.metrics.error('parse_field', e, field=field)
+                review[field] = None
+        return review
+
+    async def read_review_cards(self, card_locator):
+        # fields without a chosen selector yet are probed with all their candidates
+        result = await card_locator.evaluate_all(
+            self.EXTRACT_REVIEW_CARDS_JS,
+            [self.selectors.card_selectors(), 'partner_reply_toggle']
+        )
+        self.remember_selectors(result['chosen'])
+        return result['records']
+
+    async def expand_partner_replies(self, page, card_locator, raw_reviews):
+        # Replies already in the DOM were read with the other fields. The rest are
+        # expanded together: one click pass, one wait, one more read of the cards
+        collapsed = [i for i, raw in enumerate(raw_reviews) if raw['has_partner_reply'] and not raw['review_feedback']]
+        if not collapsed:
+            return raw_reviews
+
+        card_selector = self.selectors.selector('review_card')
+        await page.evaluate(self.EXPAND_PARTNER_REPLIES_JS, [card_selector, self.selectors.selector('partner_reply_toggle'), collapsed])
         try:
-            response = self.query_claude(text, query)
-            # print("Claude's response:", response)
-            return response
-            
-        except Exception as e:
-            print(f"Failed to get response: {e}")
+            await page.wait_for_function(
+                self.PARTNER_REPLIES_SHOWN_JS,
+                arg=[card_selector, self.selectors.selector('review_feedback'), collapsed],
+                timeout=self.SIGNAL_TIMEOUT
+            )
+        except PlaywrightTimeoutError:
+            self.metrics.increment('partner_reply_timeouts')
+            self.metrics.event('partner_replies_incomplete', level=logging.WARNING, url=page.url, expanded=len(collapsed))
+
+        expanded_reviews = await self.read_review_cards(card_locator)
+        for i in collapsed:
+            if i < len(expanded_reviews):
+                raw_reviews[i]['review_feedback'] = expanded_reviews[i]['review_feedback']
+        return raw_reviews
+
+    async def extract_page_reviews(self, page):
+        # Read every field of every review card on the page in a single evaluate() call
+        card_locator = page.locator(self.selectors.selector('review_card'))
+        with self.metrics.time_step('extract_page'):
+            raw_reviews = await self.read_review_cards(card_locator)
+
+        if self.include_partner_replies:
+            with self.metrics.time_step('partner_replies'):
+                raw_reviews = await self.expand_partner_replies(page, card_locator, raw_reviews)
+        else:
+            for raw in raw_reviews:
+                raw['review_feedback'] = []
+
+        return [self.parse_review_fields(raw) for raw in raw_reviews]
+
+    async def scrape_review_page(self, page, page_num):
+        reviews = await self.extract_page_reviews(page)
+        self.metrics.increment('pages_scraped')
+        self.metrics.increment('cards_scraped', len(reviews))
+        self.count_missing_fields(reviews)
+        self.metrics.event('page_scraped', url=page.url, page=page_num, cards=len(reviews))
+
+        return [self.add_review_text(review) for review in reviews]
+
+    async def scrape_page_range(self, page, url_link, page_nums, semaphore, page_queue, opened=False):
+        # Scrape a contiguous run of review pages on its own browser page
+        async with semaphore:
+            if not opened:
+                await self.open_review_list(page, url_link)
+
+            current_page = 1
+            for page_num in page_nums:
+                current_page = await self.go_to_review_page(page, current_page, page_num)
+                self.metrics.event('page_navigated', level=logging.DEBUG, url=page.url, page=page_num)
+                await page_queue.put((page_num, await self.scrape_review_page(page, page_num)))
+
+    async def start_browser(self):
+        # one Chromium process that every hotel and page worker shares
+        self.playwright = await async_playwright().start()
+        self.browser = await self.playwright.chromium.launch(**self.profile.launch_options())
+
+    async def close_browser(self):
+        if self.browser is not None:
+            await self.browser.close()
+            await self.playwright.stop()
+        self.browser = None
+        self.playwright = None
+
+    @asynccontextmanager
+    async def browser_session(self):
+        """
+        Keep one browser open across several scrape calls.
 
+        Usage:
+            async with scraper.browser_session():
+                await scraper.scrape_hotel_reviews(...)
+                await scraper.scrape_hotel_reviews(...)
+        """
+        await self.start_browser()
+        try:
+            yield self
+        finally:
+            await self.close_clients()
+            await self.close_browser()
+
+    async def close_clients(self):
+        # the LLM clients and their rate limiters are shared by every hotel of a session
+        await self.sentiment_classifier.close()
+        if self.translator is not None:
+            await self.translator.close()
+
+    async def new_page(self):
+        # each page gets its own context with the profile's settings and request blocking
+        context = await self.browser.new_context(**self.profile.context_options())
+        if self.profile.blocks_requests:
+            await context.route('**/*', self.route_request)
+
+        page = await context.new_page()
+        await self.track_bytes_received(page)
+        return page
+
+    async def route_request(self, route):
+        request = route.request
+        if self.profile.should_block(request.resource_type, request.url):
+            self.metrics.increment('requests_blocked')
+            await route.abort()
+        else:
+            self.metrics.increment('requests_allowed')
+            await route.continue_()
+
+    async def track_bytes_received(self, page):
+        # Chromium reports the encoded (on the wire) size of every finished response
+        cdp_session = await page.context.new_cdp_session(page)
+        cdp_session.on('Network.loadingFinished', lambda event: self.metrics.increment('bytes_received', int(event['encodedDataLength'])))
+        await cdp_session.send('Network.enable')
+
+    def split_page_range(self, page_nums, num_workers):
+        # Split the pages into contiguous chunks so each worker only moves forward
+        if not page_nums:
+            return []
+
+        chunk_size = -(-len(page_nums) // num_workers)
+        return [page_nums[i:i + chunk_size] for i in range(0, len(page_nums), chunk_size)]
+
+    async def sort_reviews_newest_first(self, page):
+        # open the sort dropdown of the review list and pick "Newest first"
+        sort_trigger = page.locator(self.selectors.selector('sort_trigger')).first
+        if not await sort_trigger.is_visible():
+            return False
+
+        previous_first_card = await self.get_first_card_text(page)
+        await sort_trigger.click()
+        await page.locator(self.selectors.selector('sort_newest')).first.click()
+
+        try:
+            await self.wait_for_review_list_change(page, previous_first_card)
+        except PlaywrightTimeoutError:
+            # the first card did not change, the list was already newest first
+            pass
+        return True
+
+    async def scrape_all_pages(self, page, url_link, start_page, max_page, num_workers, max_concurrency, page_queue):
+        # fan the review pages out over a pool of browser contexts, the first
+        # chunk reuses the page that is already showing the review list
+        page_chunks = self.split_page_range(list(range(start_page, max_page + 1)), num_workers)
+        semaphore = asyncio.Semaphore(max_concurrency)
+        self.metrics.event('scrape_pages_started', url=url_link, first_page=start_page, last_page=max_page, workers=len(page_chunks))
+
+        extra_pages = [await self.new_page() for _ in page_chunks[1:]]
+        worker_pages = [page] + extra_pages
+
+        workers = [
+            asyncio.create_task(self.scrape_page_range(worker_page, url_link, page_nums, semaphore, page_queue, opened=(worker_page is page)))
+            for worker_page, page_nums in zip(worker_pages, page_chunks)
+        ]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            # a failed worker (or a cancelled scrape) stops the others, and they are waited
+            # for before their pages close, so none is left running against a closed page
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            for extra_page in extra_pages:
+                await extra_page.context.close()
+
+    async def scrape_new_reviews(self, page, hotel_id, start_page, max_page, page_queue):
+        # walk the newest-first review pages until a page only holds reviews we already have
+        current_page = 1
+
+        for page_num in range(start_page, max_page + 1):
+            current_page = await self.go_to_review_page(page, current_page, page_num)
+            page_reviews = await self.scrape_review_page(page, page_num)
+
+            new_reviews = self.fingerprint_index.filter_new(hotel_id, page_reviews)
+            self.metrics.increment('known_reviews_skipped', len(page_reviews) - len(new_reviews))
+            self.metrics.event('new_reviews_found', hotel_id=hotel_id, page=page_num, new_reviews=len(new_reviews))
+
+            await page_queue.put((page_num, new_reviews))
+            if page_reviews and not new_reviews:
+                self.metrics.event('incremental_scrape_stopped', hotel_id=hotel_id, page=page_num)
+                break
+
+    async def run_page_producer(self, producer, page_queue):
+        # always close the queue, the consumer picks up any error from the task itself
+        try:
+            await producer
+        finally:
+            await page_queue.put(None)
+
+    async def iter_pages_in_order(self, page_queue, producer_task, first_page=1):
+        # pages can finish out of order across workers, hand them on in page order
+        pending = {}
+        next_page = first_page
+
+        while True:
+            item = await page_queue.get()
+            if item is None:
+                break
+
+            page_num, reviews = item
+            pending[page_num] = reviews
+            while next_page in pending:
+                yield next_page, pending.pop(next_page)
+                next_page += 1
+
+        # Pages are only handed on as a contiguous run from first_page, so a checkpoint
+        # of the last page handed on never skips a page that failed. When a worker
+        # failed, the finished pages after the gap are dropped and scraped again on resume
+        await producer_task
+        for page_num in sorted(pending):
+            yield page_num, pending.pop(page_num)
+
+    def check_review_identity(self, purpose):
+        # without partner replies review_feedback is None, so every replied-to review
+        # gets another identity than the one the fingerprints and unique_review index hold
+        if not self.include_partner_replies:
+            raise ValueError(f"{purpose} needs the partner replies, create the scraper with include_partner_replies=True")
+
+    def output_columns(self):
+        # the translation columns are only written when a TranslationStage fills them
+        return ReviewRecord._fields if self.translator is not None else BASE_FIELDS
+
+    def make_record(self, hotel_id, hotel_name, source_name, review):
+        return ReviewRecord(hotel_id=hotel_id, hotel_name=hotel_name, source_name=source_name, seen=False, **review)
+
+    async def iter_hotel_reviews(self, url_link, hotel_id, hotel_name, source_name, num_workers=None, max_concurrency=None, incremental=False, start_page=1, on_page_done=None, skip_known=False):
+        """
+        Scrape a hotel's reviews and yield them one ReviewRecord at a time, in page order.
+
+        Each page is classified for sentiment as soon as it is scraped, so records start
+        flowing while later pages are still loading. With `skip_known` (always on for
+        incremental scrapes) reviews already in the fingerprint index are dropped before
+        they are translated or classified; both raise ValueError on a scraper that skips
+        partner replies, whose reviews lack part of their identity. Scraping begins at
+        `start_page`, and `on_page_done(page_num, num_reviews)` is called once a page's
+        records have all been yielded, which is where callers checkpoint. Yielded
+        reviews are not added to the fingerprint index here: only the caller knows
+        whether they were stored (scrape_to_sinks records them once a persistent sink
+        has them).
+        """
+        if incremental or skip_known:
+            self.check_review_identity('Skipping known reviews')
+
+        num_workers = num_workers or self.NUM_PAGE_WORKERS
+        max_concurrency = max_concurrency or num_workers
 
-    async def scrape_hotel_reviews(self, url_link, hotel_id, hotel_name, source_name, filename):
+        # reuse the browser of an open session, otherwise run one just for this hotel
+        owns_browser = self.browser is None
+        if owns_browser:
+            await self.start_browser()
+        page = await self.new_page()
+        producer_task = None
 
         try:
-            async with async_playwright() as p:
-                browser = await p.chromium.launch(headless=False)
-                context = await browser.new_context()
-                page = await context.new_page()
-
-                positive_review_text_array = []
-                negative_review_text_array = []
-                review_rating = []
-                reviewer_names = []
-                reviewer_country = []
-                review_sentiment = []
-                review_checkin_dates = []
-                review_created_date = []
-                apartment_type = []
-                num_nights_stay = []
-                group_type = []
-                review_feedback = []
-                review_texts = []
-
-                ################### Scraping from Booking.com ###################
-                search_url = (url_link)
-                await page.goto(search_url)
-
-                await page.wait_for_timeout(self.TIMEOUT_LENGTH)
-
-                # click on see reviews button
-                await page.locator('[data-testid="fr-read-all-reviews"]').click()
-                print('Clicked on see reviews button')
-                
-                # // Locate the last <li> element within the <ol> under the <div> with class = ab95b25344
-                last_review_page_num = await page.locator('div.ab95b25344 > ol > li:last-child').text_content()
-                print('Last review page number:', last_review_page_num)
-
-                max_page = int(last_review_page_num) if int(last_review_page_num) <= 50 else 50
-                print('max page: ', max_page)
-                # for i in range(1, int(last_review_page_num) + 1):
-                for i in range(1, max_page):
-                    
-                    print(f'navigating to page {i}')
-                    # click button where aria-label = i
-                    await page.locator(f'button[aria-label=" {i}"]').click()
-                    await page.wait_for_timeout(self.TIMEOUT_LENGTH)
-                    print('Navigation successful')
-
-                    # Get all review cards
-                    review_cards = await page.locator('[aria-label="Review card"]').all()
-                    total_reviews = len(review_cards)
-                    print(f'Found {total_reviews} review cards on page {i}')
-
-                    for card in review_cards:
-                        
-                        ################################################################
-                        ##################### REVIEW TEXT SCRAPING #####################
-                        ################################################################
-                        positive_review, negative_review = await self.get_neg_pos_review(card)
-
-                        # Store the values
-                        positive_review_text_array.append(positive_review)
-                        negative_review_text_array.append(negative_review)
-
-                        ################################################################
-                        ##################### REVIEW RATING SCRAPE #####################
-                        ################################################################
-                        score = await self.get_score(card)
-                        review_rating.append(score)
-
-                        ################################################################
-                        ##################### REVIEWER NAME SCRAPE #####################
-                        ################################################################
-                        rev_name = await self.get_reviewer_name(card)
-                        reviewer_names.append(rev_name)
-
-                        ########################################################################
-                        ##################### REVIEWER CHECKIN DATE SCRAPE #####################
-                        ########################################################################
-                        rev_checkin_date = await self.get_checkin_date(card)
-                        review_checkin_dates.append(rev_checkin_date)
-
-                        ########################################################################
-                        ##################### REVIEWER CREATED DATE SCRAPE #####################
-                        ########################################################################
-                        review_date_created = await self.get_review_created_date(card)
-                        review_created_date.append(review_date_created)
-
-                        ###################################################################
-                        ##################### REVIEWER COUNTRY SCRAPE #####################
-                        ###################################################################
-                        rev_country = await self.get_country(card)
-                        reviewer_country.append(rev_country)
-
-                        ##########################################################################
-                        ##################### REVIEWER APARTMENT TYPE SCRAPE #####################
-                        ##########################################################################
-                        rev_apartment_type = await self.get_apartment_type(card)
-                        apartment_type.append(rev_apartment_type)
-
-                        ###################################################################
-                        ##################### REVIEWER LENGTH OF STAY #####################
-                        ###################################################################
-                        rev_length_stay = await self.get_length_of_stay(card)
-                        num_nights_stay.append(rev_length_stay)
-
-                        ###################################################################
-                        ##################### REVIEWER GROUP TYPE #########################
-                        ###################################################################
-                        rev_group_type = await self.get_group_type(card)
-                        group_type.append(rev_group_type)
-
-                        ###################################################################
-                        ##################### FEEDBACK TO REVIEWER ########################
-                        ###################################################################
-                        partner_reply = await self.get_partner_reply(card)
-                        review_feedback.append(partner_reply)
-                    
-
-                        ###################################################################
-                        ##################### REVIEWER SENTIMENT ##########################
-                        ###################################################################
-                        sample_content = "Positive: " + str(positive_review) + " negative: " + str(negative_review)
-                        sample_query = "tell me which sentiment fits this review best: anger, disgust, fear, joy, neutral, sadness, surprise GIVE ME ONLY THE SENTIMENT. NO OTHER WORDS."
-
-                        # check if there was any review
-                        if positive_review or negative_review:
-                            review_texts.append(sample_content)
-                            rev_sent = self.get_sentiment(sample_content, sample_query)
-                            review_sentiment.append(rev_sent)
-                            # review_sentiment.append('joy')
-                                
-                        else:
-                            review_sentiment.append(None)
-                            review_texts.append(None)
-
-                                    
-                print(f'Extracted {len(positive_review_text_array)} positive reviews in total')
-                print(f'Extracted {len(negative_review_text_array)} negative reviews in total')
-                print(f'Extracted {len(review_rating)} review ratings in total')
-                print(f'Extracted {len(reviewer_names)} review names in total')
-                print(f'Extracted {len(review_checkin_dates)} review dates in total')
-                print(f'Extracted {len(reviewer_country)} reviewer countries in total')
-                print(f'Extracted {len(apartment_type)} reviewer apartment types in total')
-                print(f'Extracted {len(num_nights_stay)} reviewer stay length in total')
-                print(f'Extracted {len(group_type)} reviewer group types in total')
-                print(f'Extracted {len(review_feedback)} reviewer feedbacks in total')
-                print(f'Extracted {len(review_sentiment)} reviewer feedbacks in total')
-                print(f'Extracted {len(review_created_date)} review date created in total')
-                print(f'Extracted {len(review_texts)} review texts in total')
-                    
-                    
-                # print('All positive reviews:', positive_review_text_array)
-                # print('All negative reviews:', negative_review_text_array)
-                # print('All review ratings:', review_rating)
-                # print('All review names:', reviewer_names)
-                # print('All review dates:', review_checkin_dates)
-                # print('All reviewer countries:', reviewer_country)
-                # print('All reviewer apartment types:', apartment_type)
-                # print('All reviewer stay lengths:', num_nights_stay)
-                # print('All reviewer group types:', group_type)
-                # print('All reviewer feedbacks:', review_feedback)
-                # print('All reviewer sentiments:', review_sentiment)
-                # print('All reviewe created dates:', review_created_date)
-                # print(f'Total positive reviews: {len(positive_review_text_array)}')
-                # print(f'Total negative reviews: {len(negative_review_text_array)}')         
-
-
-            await browser.close()
-
-            # save data as csv
-            # Create the DataFrame
-            print('saving review data to csv')
-            hotel_ids = [hotel_id] * len(review_rating)
-            hotel_name = [hotel_name] * len(review_rating)
-            source_name = [source_name] * len(review_rating)
-
-            df_reviews = self.create_review_dataframe(hotel_ids,
-                                                hotel_name,
-                                                source_name,
-                                                positive_review_text_array,
-                                                negative_review_text_array,
-                                                review_rating,
-                                                reviewer_names,
-                                                reviewer_country,
-                                                review_sentiment,
-                                                review_checkin_dates,
-                                                review_created_date,
-                                                apartment_type,
-                                                num_nights_stay,
-                                                group_type,
-                                                review_feedback,
-                                                review_texts)
-
-            # saving reviews as csv
-            self.save_to_csv(filename, df_reviews)
-            return df_reviews
+            ################### Scraping from Booking.com ###################
+            await self.open_review_list(page, url_link)
+
+            last_review_page_num = await self.get_last_review_page(page)
+            max_page = min(last_review_page_num, self.MAX_REVIEW_PAGES)
+            self.metrics.event('review_list_opened', hotel_id=hotel_id, last_review_page=last_review_page_num, max_page=max_page)
+
+            # stopping early is only safe when the newest reviews come first
+            if incremental and not await self.sort_reviews_newest_first(page):
+                self.metrics.event('incremental_scrape_unavailable', level=logging.WARNING, hotel_id=hotel_id, reason='could not sort reviews newest first')
+                incremental = False
+
+            page_queue = asyncio.Queue()
+            if incremental:
+                producer = self.scrape_new_reviews(page, hotel_id, start_page, max_page, page_queue)
+            else:
+                producer = self.scrape_all_pages(page, url_link, start_page, max_page, num_workers, max_concurrency, page_queue)
+            producer_task = asyncio.create_task(self.run_page_producer(producer, page_queue))
+
+            async for page_num, reviews in self.iter_pages_in_order(page_queue, producer_task, first_page=start_page):
+                # incremental pages were already filtered while deciding whether to stop
+                if skip_known and not incremental:
+                    new_reviews = self.fingerprint_index.filter_new(hotel_id, reviews)
+                    self.metrics.increment('known_reviews_skipped', len(reviews) - len(new_reviews))
+                    reviews = new_reviews
+
+                # the LLM calls run while the workers keep scraping the next pages
+                if self.translator is not None:
+                    with self.metrics.time_step('translate_page'):
+                        await self.translate_reviews(reviews)
+
+                with self.metrics.time_step('classify_page'):
+                    await self.classify_reviews(reviews)
+
+                for review in reviews:
+                    yield self.make_record(hotel_id, hotel_name, source_name, review)
+
+                if on_page_done is not None:
+                    on_page_done(page_num, len(reviews))
+        finally:
+            if producer_task is not None:
+                producer_task.cancel()
+                # the page workers must have stopped before their page and browser close
+                await asyncio.gather(producer_task, return_exceptions=True)
+            await page.context.close()
+            # inside a browser_session other hotels may still be using the LLM clients
+            if owns_browser:
+                await self.close_clients()
+                await self.close_browser()
+
+    async def scrape_to_sinks(self, url_link, hotel_id, hotel_name, source_name, sinks, **scrape_options):
+        if any(sink.uses_review_identity for sink in sinks):
+            self.check_review_identity('Loading into the reviews table')
+
+        # stream the records into every sink, partial progress is flushed even if the scrape fails
+        records_scraped = 0
+        fingerprints = []
+        try:
+            async for record in self.iter_hotel_reviews(url_link, hotel_id, hotel_name, source_name, **scrape_options):
+                with self.metrics.time_step('write_sinks'):
+                    for sink in sinks:
+                        sink.write(record)
+                fingerprints.append(review_fingerprint(hotel_id, record._asdict()))
+                records_scraped += 1
+        finally:
+            with self.metrics.time_step('close_sinks'):
+                for sink in sinks:
+                    sink.close()
+
+            # reviews only count as known once they are stored somewhere, otherwise a
+            # skipped or in-memory-only run would hide them from every later incremental scrape
+            if not self.include_partner_replies:
+                self.metrics.event('fingerprints_not_recorded', hotel_id=hotel_id, reviews=records_scraped, reason='partner replies skipped')
+            elif any(sink.persistent for sink in sinks):
+                self.fingerprint_index.add_many(hotel_id, fingerprints)
+            else:
+                self.metrics.event('fingerprints_not_recorded', hotel_id=hotel_id, reviews=records_scraped, reason='no persistent sink')
+
+        self.metrics.increment('records_written', records_scraped)
+        self.metrics.event('hotel_scraped', hotel_id=hotel_id, reviews=records_scraped, llm_cache=self.cache.stats())
+        self.metrics.export()
+        return records_scraped
+
+    async def scrape_hotel_reviews(self, url_link, hotel_id, hotel_name, source_name, filename, num_workers=None, max_concurrency=None, incremental=False, if_exists='prompt', parquet_dir=None):
+
+        try:
+            # collect the records for the returned DataFrame, the outputs are written as we go
+            collector = RecordCollector()
+            sinks = [collector]
+
+            # an incremental run skips the reviews the outputs already hold, so it adds
+            # to them: replacing them would lose reviews the index still calls known
+            if incremental:
+                if if_exists == 'overwrite':
+                    raise ValueError("Incremental scrapes append to the existing outputs, if_exists='overwrite' is not allowed")
+                if if_exists == 'prompt':
+                    if_exists = 'append'
+
+            write_mode = self.resolve_write_mode(filename, if_exists)
+            if write_mode is not None:
+                sinks.append(CsvSink(filename, overwrite=(write_mode == 'overwrite'), columns=self.output_columns()))
+            else:
+                self.metrics.event('save_skipped', filename=filename)
+
+            # the Parquet store follows the same policy, prompting is only for the CSV
+            if parquet_dir is not None:
+                sinks.append(ParquetSink(parquet_dir, if_exists='append' if if_exists == 'prompt' else if_exists, metrics=self.metrics))
+
+            await self.scrape_to_sinks(url_link, hotel_id, hotel_name, source_name, sinks,
+                                       num_workers=num_workers,
+                                       max_concurrency=max_concurrency,
+                                       incremental=incremental)
+
+            if write_mode is not None:
+                self.metrics.event('saved', filename=filename, rows=len(collector.records), mode=write_mode)
+            return records_to_dataframe(collector.records, self.output_columns())
 
         except Exception as e:
-            print(f"An error occurred: {e}")
+            self.metrics.error('scrape_hotel_reviews', e, hotel_id=hotel_id)
             return {"error": str(e)}
 
 
@@ -0,0 +1,233 @@
+import os
+import pandas as pd
+import psycopg2
+from dotenv import load_dotenv
+
+# month bucket for reviews without a created date, same default as the unique_review index
+UNKNOWN_MONTH = '2000-01-01'
+MONTH_EXPRESSION = f"COALESCE(date_trunc('month', review_created_date)::date, DATE '{UNKNOWN_MONTH}')"
+
+# review columns counted per value in hotel_monthly_counts
+COUNT_DIMENSIONS = ('sentiment', 'country', 'group_type')
+
+ROLLUP_TABLES_SQL = """
+CREATE TABLE IF NOT EXISTS hotel_monthly_stats (
+    hotel_id VARCHAR(20) REFERENCES hotels(hotel_id) ON DELETE CASCADE,
+    month DATE,
+    review_count INT NOT NULL DEFAULT 0,
+    rating_sum DECIMAL(14,2) NOT NULL DEFAULT 0,
+    rating_count INT NOT NULL DEFAULT 0,
+    unseen_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (hotel_id, month)
+);
+
+CREATE TABLE IF NOT EXISTS hotel_monthly_counts (
+    hotel_id VARCHAR(20) REFERENCES hotels(hotel_id) ON DELETE CASCADE,
+    month DATE,
+    dimension VARCHAR(20),
+    value VARCHAR(100),
+    review_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (hotel_id, month, dimension, value)
+);
+"""
+
+
+class HotelRollups:
+    """
+    Per-hotel, per-month aggregates of the reviews table for the dashboard.
+
+    hotel_monthly_stats holds review, rating and unseen counts and hotel_monthly_counts
+    holds sentiment, country and group_type histograms (missing values are counted
+    under ''). Months come from review_created_date, and reviews without one are
+    counted under UNKNOWN_MONTH. PostgresLoader calls `apply` with the rows it
+    actually inserted, inside its own transaction, so the rollups never drift from
+    the reviews they summarise. `mark_seen` keeps the unseen counts current and
+    `rebuild` recomputes everything from the reviews table. The query methods only
+    read the rollup tables.
+    """
+
+    def __init__(self, dsn=None, conn=None):
+        load_dotenv()
+        self.dsn = dsn or os.getenv('LOCAL_POSTGRES')
+        self.conn = conn
+
+    def connect(self):
+        if self.conn is None or self.conn.closed:
+            self.conn = psycopg2.connect(self.dsn)
+        return self.conn
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def create_tables(self):
+        conn = self.connect()
+        with conn:
+            with conn.cursor() as cursor:
+                cursor.execute(ROLLUP_TABLES_SQL)
+
+    ########################### Maintenance ###########################
+
+    def apply(self, cursor, source, where='', params=()):
+        """
+        Add the reviews in `source` to the rollups.
+
+        Args:
+            cursor: Cursor of the transaction that inserted the reviews
+            source (str): Table holding the new rows with the reviews table's column names
+            where (str): Optional SQL condition on `source`
+            params (tuple): Parameters of `where`
+        """
+        condition = f"hotel_id IS NOT NULL AND ({where})" if where else "hotel_id IS NOT NULL"
+
+        cursor.execute(
+            f"INSERT INTO hotel_monthly_stats (hotel_id, month, review_count, rating_sum, rating_count, unseen_count) "
+            f"SELECT hotel_id, {MONTH_EXPRESSION}, COUNT(*), COALESCE(SUM(review_rating), 0), COUNT(review_rating), "
+            f"COUNT(*) FILTER (WHERE seen IS NOT TRUE) "
+            f"FROM {source} WHERE {condition} GROUP BY 1, 2 "
+            f"ON CONFLICT (hotel_id, month) DO UPDATE SET "
+            f"review_count = hotel_monthly_stats.review_count + EXCLUDED.review_count, "
+            f"rating_sum = hotel_monthly_stats.rating_sum + EXCLUDED.rating_sum, "
+            f"rating_count = hotel_monthly_stats.rating_count + EXCLUDED.rating_count, "
+            f"unseen_count = hotel_monthly_stats.unseen_count + EXCLUDED.unseen_count",
+            params
+        )
+
+        dimension_values = ', '.join(f"('{dimension}', {dimension})" for dimension in COUNT_DIMENSIONS)
+        cursor.execute(
+            f"INSERT INTO hotel_monthly_counts (hotel_id, month, dimension, value, review_count) "
+            f"SELECT hotel_id, {MONTH_EXPRESSION}, d.dimension, COALESCE(d.value, ''), COUNT(*) "
+            f"FROM {source} CROSS JOIN LATERAL (VALUES {dimension_values}) AS d(dimension, value) "
+            f"WHERE {condition} GROUP BY 1, 2, 3, 4 "
+            f"ON CONFLICT (hotel_id, month, dimension, value) DO UPDATE SET "
+            f"review_count = hotel_monthly_counts.review_count + EXCLUDED.review_count",
+            params
+        )
+
+    def rebuild(self, hotel_id=None):
+        # recompute from the reviews table, for a first backfill or after deleting reviews
+        where, params = ("hotel_id = %s", (hotel_id,)) if hotel_id is not None else ('', ())
+        conn = self.connect()
+
+        with conn:
+            with conn.cursor() as cursor:
+                for table in ('hotel_monthly_stats', 'hotel_monthly_counts'):
+                    cursor.execute(f"DELETE FROM {table}" + (f" WHERE {where}" if where else ''), params)
+                self.apply(cursor, 'reviews', where, params)
+
+    def mark_seen(self, review_ids):
+        """
+        Flag reviews as seen and take them off the unseen counts.
+
+        Args:
+            review_ids (list): review_id values from the reviews table
+
+        Returns:
+            int: Number of reviews that were unseen before
+        """
+        if not review_ids:
+            return 0
+
+        conn = self.connect()
+        with conn:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    f"WITH updated AS ("
+                    f"UPDATE reviews SET seen = TRUE WHERE review_id = ANY(%s) AND seen IS NOT TRUE "
+                    f"RETURNING hotel_id, review_created_date"
+                    f"), per_month AS ("
+                    f"SELECT hotel_id, {MONTH_EXPRESSION} AS month, COUNT(*) AS n FROM updated GROUP BY 1, 2"
+                    f"), adjusted AS ("
+                    f"UPDATE hotel_monthly_stats s SET unseen_count = s.unseen_count - p.n "
+                    f"FROM per_month p WHERE s.hotel_id = p.hotel_id AND s.month = p.month"
+                    f") SELECT COALESCE(SUM(n), 0) FROM per_month",
+                    (list(review_ids),)
+                )
+                return int(cursor.fetchone()[0])
+
+    ############################# Queries #############################
+
+    def month_filter(self, hotel_id, start_month=None, end_month=None):
+        conditions, params = ["hotel_id = %s"], [hotel_id]
+        if start_month is not None:
+            conditions.append("month >= date_trunc('month', %s::date)")
+            params.append(start_month)
+        if end_month is not None:
+            conditions.append("month <= date_trunc('month', %s::date)")
+            params.append(end_month)
+        return ' AND '.join(conditions), params
+
+    def fetch(self, query, params):
+        conn = self.connect()
+        with conn:
+            with conn.cursor() as cursor:
+                cursor.execute(query, params)
+                columns = [column.name for column in cursor.description]
+                return pd.DataFrame(cursor.fetchall(), columns=columns)
+
+    def monthly_summary(self, hotel_id, start_month=None, end_month=None):
+        """
+        Review count, average rating and unseen count per month.
+
+        Returns:
+            DataFrame: month, review_count, average_rating, unseen_count
+        """
+        condition, params = self.month_filter(hotel_id, start_month, end_month)
+        return self.fetch(
+            f"SELECT month, review_count, rating_sum / NULLIF(rating_count, 0) AS average_rating, unseen_count "
+            f"FROM hotel_monthly_stats WHERE {condition} ORDER BY month",
+            params
+        )
+
+    def hotel_summary(self, hotel_id, start_month=None, end_month=None):
+        """
+        Totals over a range of months (all months by default).
+
+        Returns:
+            dict: review_count, average_rating (None without ratings) and unseen_count
+        """
+        condition, params = self.month_filter(hotel_id, start_month, end_month)
+        summary = self.fetch(
+            f"SELECT COALESCE(SUM(review_count), 0) AS review_count, "
+            f"SUM(rating_sum) / NULLIF(SUM(rating_count), 0) AS average_rating, "
+            f"COALESCE(SUM(unseen_count), 0) AS unseen_count "
+            f"FROM hotel_monthly_stats WHERE {condition}",
+            params
+        ).iloc[0]
+
+        average_rating = summary['average_rating']
+        return {
+            'review_count': int(summary['review_count']),
+            'average_rating': float(average_rating) if average_rating is not None else None,
+            'unseen_count': int(summary['unseen_count']),
+        }
+
+    def average_rating(self, hotel_id, start_month=None, end_month=None):
+        return self.hotel_summary(hotel_id, start_month, end_month)['average_rating']
+
+    def unseen_count(self, hotel_id):
+        return self.hotel_summary(hotel_id)['unseen_count']
+
+    def value_counts(self, hotel_id, dimension, start_month=None, end_month=None):
+        """
+        Review count per value of sentiment, country or group_type, most common first.
+
+        Returns:
+            DataFrame: value ('' for reviews without one), review_count
+        """
+        if dimension not in COUNT_DIMENSIONS:
+            raise ValueError(f"Unknown dimension: {dimension}, expected one of {COUNT_DIMENSIONS}")
+
+        condition, params = self.month_filter(hotel_id, start_month, end_month)
+        return self.fetch(
+            f"SELECT value, SUM(review_count)::int AS review_count FROM hotel_monthly_counts "
+            f"WHERE {condition} AND dimension = %s GROUP BY value ORDER BY review_count DESC, value",
+            params + [dimension]
+        )
+
+    def dominant_sentiment(self, hotel_id, start_month=None, end_month=None):
+        # most common sentiment, reviews without one don't count
+        counts = self.value_counts(hotel_id, 'sentiment', start_month, end_month)
+        counts = counts[counts['value'] != '']
+        return counts['value'].iloc[0] if len(counts) else None
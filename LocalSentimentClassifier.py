@@ -0,0 +1,109 @@
+import asyncio
+import os
+
+from ScrapeMetrics import ScrapeMetrics
+from SentimentClassifier import SENTIMENT_LABELS, SentimentBackend
+
+
+class LocalSentimentClassifier(SentimentBackend):
+    """
+    Offline sentiment backend running a Hugging Face emotion model on the CPU.
+
+    The default model predicts exactly the seven SENTIMENT_LABELS. Texts are sorted by
+    length before batching so each batch pads as little as possible, and inference runs
+    in a worker thread so the event loop stays free. With `use_onnx=True` the model is
+    exported to ONNX and run with onnxruntime (needs `optimum[onnxruntime]`).
+    """
+
+    MODEL = "j-hartmann/emotion-english-distilroberta-base"
+    BATCH_SIZE = 64
+    MAX_LENGTH = 256
+
+    # identifies the classification task in ResultCache keys, same as SentimentClassifier
+    CACHE_PROMPT = "sentiment:" + ",".join(SENTIMENT_LABELS)
+
+    def __init__(self, model=None, batch_size=None, num_threads=None, use_onnx=False, max_length=None, cache=None, metrics=None):
+        self.model = model or self.MODEL
+        self.batch_size = batch_size or self.BATCH_SIZE
+        self.num_threads = num_threads or os.cpu_count()
+        self.use_onnx = use_onnx
+        self.max_length = max_length or self.MAX_LENGTH
+        self.cache = cache
+        self.metrics = metrics or ScrapeMetrics()
+
+        self.tokenizer = None
+        self.classifier = None
+
+    def load(self):
+        # models are loaded on first use, the download/export only happens once
+        if self.classifier is not None:
+            return
+
+        import torch
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+        torch.set_num_threads(self.num_threads)
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model)
+
+        if self.use_onnx:
+            import onnxruntime
+            from optimum.onnxruntime import ORTModelForSequenceClassification
+
+            session_options = onnxruntime.SessionOptions()
+            session_options.intra_op_num_threads = self.num_threads
+            self.classifier = ORTModelForSequenceClassification.from_pretrained(
+                self.model, export=True, provider='CPUExecutionProvider', session_options=session_options
+            )
+        else:
+            self.classifier = AutoModelForSequenceClassification.from_pretrained(self.model)
+            self.classifier.eval()
+
+    def classify_sync(self, texts):
+        """
+        Classify texts in batches on the CPU.
+
+        Args:
+            texts (list): Non-empty review texts
+
+        Returns:
+            list: One label from SENTIMENT_LABELS (or None) per text
+        """
+        import torch
+
+        self.load()
+        id2label = self.classifier.config.id2label
+
+        # longest first, so texts of similar length share a batch
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+        labels = [None] * len(texts)
+
+        with torch.inference_mode():
+            for start in range(0, len(order), self.batch_size):
+                batch_indices = order[start:start + self.batch_size]
+                inputs = self.tokenizer(
+                    [texts[i] for i in batch_indices],
+                    padding=True, truncation=True, max_length=self.max_length, return_tensors='pt'
+                )
+                predictions = self.classifier(**inputs).logits.argmax(dim=-1).tolist()
+
+                for i, prediction in zip(batch_indices, predictions):
+                    label = id2label[prediction].lower()
+                    labels[i] = label if label in SENTIMENT_LABELS else None
+
+        return labels
+
+    async def classify(self, texts):
+        cached = self.cache.get_many(texts, self.CACHE_PROMPT, self.model) if self.cache else {}
+        to_classify = sorted({text for text in texts if text and text not in cached})
+
+        new_labels = {}
+        if to_classify:
+            with self.metrics.time_step('sentiment_local'):
+                labels = await asyncio.to_thread(self.classify_sync, to_classify)
+            self.metrics.increment('local_sentiment_texts', len(to_classify))
+            new_labels = dict(zip(to_classify, labels))
+
+        if self.cache:
+            self.cache.set_many(new_labels, self.CACHE_PROMPT, self.model)
+
+        return [cached.get(text, new_labels.get(text)) if text else None for text in texts]
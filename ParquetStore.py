@@ -0,0 +1,163 @@
+import os
+import shutil
+import uuid
+from datetime import date
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from ReviewNormalizer import normalize_reviews
+from ReviewRecord import ReviewRecord
+from ScrapeMetrics import ScrapeMetrics
+
+# Hive-style partition columns: <base_dir>/source_name=.../hotel_id=.../scrape_date=YYYY-MM-DD/part-*.parquet
+PARTITION_COLUMNS = ['source_name', 'hotel_id', 'scrape_date']
+
+# partition values are read back with these types, hive type inference would turn a
+# hotel_id like "007" into the integer 7
+PARTITIONING = ds.partitioning(
+    pa.schema([('source_name', pa.string()), ('hotel_id', pa.string()), ('scrape_date', pa.date32())]),
+    flavor='hive'
+)
+
+_dictionary = pa.dictionary(pa.int32(), pa.string())
+
+# column types of the files, the normalized types of create_review_dataframe
+REVIEW_ARROW_SCHEMA = pa.schema([
+    ('hotel_name', _dictionary),
+    ('positive_review', pa.string()),
+    ('negative_review', pa.string()),
+    ('review_rating', pa.float64()),
+    ('reviewer_name', pa.string()),
+    ('country', _dictionary),
+    ('sentiment', _dictionary),
+    ('reviewer_check_in_date', pa.date32()),
+    ('review_created_date', pa.date32()),
+    ('apartment_type', _dictionary),
+    ('length_nights_stay', pa.int32()),
+    ('group_type', _dictionary),
+    ('review_feedback', pa.string()),
+    ('seen', pa.bool_()),
+    ('review_text', pa.string()),
+    ('review_text_original', pa.string()),
+    ('review_language', pa.string()),
+])
+
+IF_EXISTS_OPTIONS = ('append', 'overwrite', 'skip', 'error')
+
+
+def partition_path(base_dir, source_name, hotel_id, scrape_date=None):
+    scrape_date = scrape_date or date.today()
+    return os.path.join(
+        base_dir,
+        f'source_name={source_name}',
+        f'hotel_id={hotel_id}',
+        f'scrape_date={scrape_date.isoformat() if hasattr(scrape_date, "isoformat") else scrape_date}',
+    )
+
+
+def prepare_partition(partition_dir, if_exists):
+    """
+    Apply the overwrite policy to a partition before writing to it.
+
+    Returns:
+        bool: False when the partition already holds data and should be left alone
+    """
+    if if_exists not in IF_EXISTS_OPTIONS:
+        raise ValueError(f"if_exists must be one of {IF_EXISTS_OPTIONS}, got {if_exists!r}")
+
+    has_data = os.path.isdir(partition_dir) and any(name.endswith('.parquet') for name in os.listdir(partition_dir))
+    if has_data:
+        if if_exists == 'error':
+            raise FileExistsError(f"Partition '{partition_dir}' already holds review data")
+        if if_exists == 'skip':
+            return False
+        if if_exists == 'overwrite':
+            shutil.rmtree(partition_dir)
+
+    os.makedirs(partition_dir, exist_ok=True)
+    return True
+
+
+def new_part_file(partition_dir):
+    # appends never touch existing files, each write adds a uniquely named part
+    return os.path.join(partition_dir, f'part-{uuid.uuid4().hex}.parquet')
+
+
+def to_arrow_table(df, metrics=None):
+    # normalize, then keep only the non-partition columns in schema order; the files
+    # have no VARCHAR lengths, so nothing is cut to the reviews table's limits
+    df = normalize_reviews(df.reindex(columns=[field for field in ReviewRecord._fields]), varchar_limits=False, metrics=metrics)
+    for column in ['reviewer_check_in_date', 'review_created_date']:
+        df[column] = df[column].dt.date
+
+    return pa.Table.from_pandas(df[REVIEW_ARROW_SCHEMA.names], schema=REVIEW_ARROW_SCHEMA, preserve_index=False)
+
+
+def write_reviews(df, base_dir, scrape_date=None, if_exists='append', metrics=None):
+    """
+    Write a review frame to the partitioned Parquet store, one new file per hotel.
+
+    Args:
+        df (pd.DataFrame): Frame from create_review_dataframe or a sink
+        base_dir (str): Root directory of the store
+        scrape_date (date): Partition date, today if None
+        if_exists (str): 'append' adds a file, 'overwrite' replaces the partition,
+            'skip' leaves a non-empty partition alone and 'error' raises
+        metrics (ScrapeMetrics): Receives the skipped partitions and normalization counts
+
+    Returns:
+        list: Paths of the files written
+    """
+    metrics = metrics or ScrapeMetrics()
+    written = []
+    for (source_name, hotel_id), hotel_df in df.groupby(['source_name', 'hotel_id'], observed=True, sort=False):
+        partition_dir = partition_path(base_dir, source_name, hotel_id, scrape_date)
+        if not prepare_partition(partition_dir, if_exists):
+            metrics.increment('partitions_skipped')
+            metrics.event('partition_skipped', partition=partition_dir, if_exists=if_exists)
+            continue
+
+        path = new_part_file(partition_dir)
+        pq.write_table(to_arrow_table(hotel_df, metrics), path, compression='zstd')
+        written.append(path)
+
+    return written
+
+
+def store_root(path):
+    # the store directory above a partition directory or part file, the path itself otherwise
+    parts = os.path.abspath(path).split(os.sep)
+    for i, part in enumerate(parts):
+        if part.startswith(f'{PARTITION_COLUMNS[0]}='):
+            return os.sep.join(parts[:i]) or os.sep
+    return os.path.abspath(path)
+
+
+def read_reviews(base_dir, columns=None, hotel_id=None, source_name=None, filters=None):
+    """
+    Read reviews back from the store, only touching the requested columns and partitions.
+
+    The partition columns only live in the directory names, so they are filled in
+    from the path; reading a part file on its own would leave them empty.
+
+    Args:
+        base_dir (str): Root directory of the store, or a partition directory or part file in it
+        columns (list): Columns to load, all if None (partition columns included)
+        hotel_id (str): Only read this hotel's partitions
+        source_name (str): Only read this source's partitions
+        filters: Extra pyarrow dataset filter expression
+
+    Returns:
+        pd.DataFrame: The matching reviews
+    """
+    dataset = ds.dataset(base_dir, format='parquet', partitioning=PARTITIONING, partition_base_dir=store_root(base_dir))
+
+    expression = filters
+    for column, value in [('hotel_id', hotel_id), ('source_name', source_name)]:
+        if value is not None:
+            condition = ds.field(column) == value
+            expression = condition if expression is None else expression & condition
+
+    return dataset.to_table(columns=columns, filter=expression).to_pandas()
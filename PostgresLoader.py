@@ -0,0 +1,133 @@
+import io
+import os
+import pandas as pd
+import psycopg2
+from dotenv import load_dotenv
+
+from ReviewNormalizer import normalize_reviews
+from ScrapeMetrics import ScrapeMetrics
+
+# columns of the reviews table that come from the scraper (review_id is generated)
+REVIEW_COLUMNS = [
+    'hotel_id', 'hotel_name', 'source_name', 'positive_review', 'negative_review', 'review_rating',
+    'reviewer_name', 'country', 'sentiment', 'reviewer_check_in_date', 'review_created_date',
+    'apartment_type', 'length_nights_stay', 'group_type', 'review_feedback', 'seen', 'review_text'
+]
+
+
+class PostgresLoader:
+    """
+    Bulk loads scraped reviews into the reviews table.
+
+    Rows are streamed with COPY into a temporary staging table and merged with
+    INSERT ... SELECT ... ON CONFLICT DO NOTHING, so rows that hit the unique_review
+    index are skipped instead of failing the whole batch. When a HotelRollups is given,
+    the rows that were actually inserted are added to the hotel rollups in the same
+    transaction. Each load is counted in `metrics` as rows_inserted and rows_skipped.
+    """
+
+    BATCH_SIZE = 50_000
+    NULL_MARKER = '\\N'
+
+    def __init__(self, dsn=None, conn=None, rollups=None, metrics=None):
+        load_dotenv()
+        self.dsn = dsn or os.getenv('LOCAL_POSTGRES')
+        self.conn = conn
+        self.rollups = rollups
+        self.metrics = metrics or ScrapeMetrics()
+
+    def connect(self):
+        if self.conn is None or self.conn.closed:
+            self.conn = psycopg2.connect(self.dsn)
+        return self.conn
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def read_source(self, source):
+        # accept the DataFrame from create_review_dataframe, a saved CSV, or the Parquet
+        # store (its directory, a partition or a part file)
+        if isinstance(source, pd.DataFrame):
+            return source
+        if os.path.isdir(source) or str(source).endswith('.parquet'):
+            # pyarrow is only needed when loading from the Parquet store; hotel_id and
+            # source_name come from the partition path, the part files don't hold them
+            import ParquetStore
+            return ParquetStore.read_reviews(source)
+        return pd.read_csv(source)
+
+    def prepare_dataframe(self, df):
+        # line the frame up with the table columns and convert every column to the table's types
+        return normalize_reviews(df.reindex(columns=REVIEW_COLUMNS), metrics=self.metrics)
+
+    def copy_to_staging(self, cursor, df, batch_size):
+        column_list = ', '.join(REVIEW_COLUMNS)
+
+        for start in range(0, len(df), batch_size):
+            buffer = io.StringIO()
+            df.iloc[start:start + batch_size].to_csv(buffer, index=False, header=False, na_rep=self.NULL_MARKER)
+            buffer.seek(0)
+            cursor.copy_expert(
+                f"COPY reviews_staging ({column_list}) FROM STDIN WITH (FORMAT csv, NULL '{self.NULL_MARKER}')",
+                buffer
+            )
+
+    def load(self, source, batch_size=None):
+        """
+        Load reviews into Postgres, skipping rows that already exist.
+
+        Args:
+            source: DataFrame, path to a CSV file, or a Parquet store directory,
+                partition or part file
+            batch_size (int): Rows sent per COPY chunk
+
+        Returns:
+            dict: Number of rows staged, inserted and skipped as duplicates
+
+        Raises:
+            ValueError: A hotel_id, reviewer_name or apartment_type is longer than its
+                column; nothing is loaded
+        """
+        df = self.prepare_dataframe(self.read_source(source))
+        column_list = ', '.join(REVIEW_COLUMNS)
+        conn = self.connect()
+
+        # one transaction: either the whole file is merged or nothing is
+        with conn:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    f"CREATE TEMP TABLE reviews_staging ON COMMIT DROP AS "
+                    f"SELECT {column_list} FROM reviews WITH NO DATA"
+                )
+                self.copy_to_staging(cursor, df, batch_size or self.BATCH_SIZE)
+
+                if self.rollups is None:
+                    cursor.execute(
+                        f"INSERT INTO reviews ({column_list}) "
+                        f"SELECT {column_list} FROM reviews_staging "
+                        f"ON CONFLICT DO NOTHING"
+                    )
+                    inserted = cursor.rowcount
+                else:
+                    # keep the inserted rows (not the skipped duplicates) for the rollups
+                    cursor.execute(
+                        f"CREATE TEMP TABLE reviews_inserted ON COMMIT DROP AS "
+                        f"SELECT {column_list} FROM reviews WITH NO DATA"
+                    )
+                    cursor.execute(
+                        f"WITH inserted AS ("
+                        f"INSERT INTO reviews ({column_list}) "
+                        f"SELECT {column_list} FROM reviews_staging "
+                        f"ON CONFLICT DO NOTHING RETURNING {column_list}"
+                        f") INSERT INTO reviews_inserted ({column_list}) SELECT {column_list} FROM inserted"
+                    )
+                    inserted = cursor.rowcount
+                    self.rollups.apply(cursor, 'reviews_inserted')
+
+        result = {'staged': len(df), 'inserted': inserted, 'skipped': len(df) - inserted}
+        self.metrics.increment('rows_inserted', result['inserted'])
+        self.metrics.increment('rows_skipped', result['skipped'])
+        self.metrics.event('reviews_loaded', **result)
+        return result
@@ -0,0 +1,61 @@
+import asyncio
+import time
+from urllib.parse import urlparse
+
+
+class RateLimiter:
+    """
+    Async rate limiter that spaces calls out to at most `rate` per `period` seconds.
+
+    Usage:
+        limiter = RateLimiter(rate=50, period=60)
+        async with limiter:
+            await do_request()
+    """
+
+    def __init__(self, rate, period=1.0):
+        self.interval = period / rate
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        # reserve the next free slot, then sleep outside the lock until it arrives
+        async with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+
+        wait = slot - now
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+
+class DomainRateLimiter:
+    """
+    Keeps a separate RateLimiter per domain, so politeness limits apply per site.
+
+    Usage:
+        limiter = DomainRateLimiter(rate=1, period=2)
+        await limiter.acquire('https://www.booking.com/hotel/...')
+    """
+
+    def __init__(self, rate, period=1.0):
+        self.rate = rate
+        self.period = period
+        self.limiters = {}
+
+    def limiter_for(self, url):
+        domain = urlparse(url).hostname or ''
+        if domain not in self.limiters:
+            self.limiters[domain] = RateLimiter(self.rate, self.period)
+        return self.limiters[domain]
+
+    async def acquire(self, url):
+        await self.limiter_for(url).acquire()
@@ -0,0 +1,130 @@
+import hashlib
+import os
+import re
+import sqlite3
+import time
+import unicodedata
+
+
+class ResultCache:
+    """
+    Persistent on-disk cache for LLM results (sentiment labels, translations, ...).
+
+    Entries are keyed by a SHA-256 of (normalized text, prompt, model) and stored in
+    SQLite. When the cache grows past `max_entries` the least recently used entries
+    are evicted. Hit/miss counters are kept for the lifetime of the object.
+    """
+
+    DEFAULT_PATH = os.path.join('cache', 'llm_results.sqlite')
+    MAX_ENTRIES = 500_000
+
+    def __init__(self, path=None, max_entries=None):
+        self.path = path or self.DEFAULT_PATH
+        self.max_entries = max_entries or self.MAX_ENTRIES
+        self.hits = 0
+        self.misses = 0
+
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS results ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, last_used REAL NOT NULL)'
+        )
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_results_last_used ON results(last_used)')
+        self.conn.commit()
+
+    @staticmethod
+    def normalize_text(text):
+        # unicode-normalize and collapse whitespace so trivially different copies share a key
+        return re.sub(r'\s+', ' ', unicodedata.normalize('NFC', str(text))).strip()
+
+    @classmethod
+    def make_key(cls, text, prompt, model):
+        payload = '\x1f'.join([cls.normalize_text(text), prompt, model])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, text, prompt, model):
+        return self.get_many([text], prompt, model).get(text)
+
+    def set(self, text, value, prompt, model):
+        self.set_many({text: value}, prompt, model)
+
+    def get_many(self, texts, prompt, model):
+        """
+        Look up many texts at once.
+
+        Args:
+            texts (list): Texts to look up
+            prompt (str): Prompt the results were produced with
+            model (str): Model the results were produced with
+
+        Returns:
+            dict: text -> cached value, for the texts that were found
+        """
+        keys = {self.make_key(text, prompt, model): text for text in texts if text is not None}
+        found = {}
+
+        key_list = list(keys)
+        # stay under SQLite's bound-parameter limit
+        for i in range(0, len(key_list), 500):
+            chunk = key_list[i:i + 500]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self.conn.execute(f'SELECT key, value FROM results WHERE key IN ({placeholders})', chunk).fetchall()
+            found.update(rows)
+
+        if found:
+            now = time.time()
+            self.conn.executemany('UPDATE results SET last_used = ? WHERE key = ?', [(now, key) for key in found])
+            self.conn.commit()
+
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+
+        return {keys[key]: value for key, value in found.items()}
+
+    def set_many(self, values, prompt, model):
+        """
+        Store many results at once.
+
+        Args:
+            values (dict): text -> result, None results are not stored
+            prompt (str): Prompt the results were produced with
+            model (str): Model the results were produced with
+        """
+        now = time.time()
+        rows = [
+            (self.make_key(text, prompt, model), value, now, now)
+            for text, value in values.items()
+            if text is not None and value is not None
+        ]
+        if not rows:
+            return
+
+        self.conn.executemany('INSERT OR REPLACE INTO results (key, value, created_at, last_used) VALUES (?, ?, ?, ?)', rows)
+        self.evict()
+        self.conn.commit()
+
+    def evict(self):
+        # drop the least recently used entries once the cache is over its size bound
+        (count,) = self.conn.execute('SELECT COUNT(*) FROM results').fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self.conn.execute(
+                'DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY last_used LIMIT ?)', (excess,)
+            )
+
+    def stats(self):
+        (size,) = self.conn.execute('SELECT COUNT(*) FROM results').fetchone()
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'size': size,
+        }
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,258 @@
+import csv
+import hashlib
+import math
+import os
+import sqlite3
+import tempfile
+from datetime import datetime
+
+# defaults the unique_review index uses in its COALESCE() calls
+DEFAULT_DATE = '2000-01-01'
+DEFAULT_NIGHTS = -1
+
+# date formats seen in scraped output ("March 2025", "February 12, 2025") and in the database
+DATE_FORMATS = ('%Y-%m-%d', '%B %Y', '%b %Y', '%B %y', '%B %d, %Y', '%b %d, %Y', '%d %B %Y')
+
+FINGERPRINT_COLUMNS = [
+    'hotel_id', 'reviewer_name', 'positive_review', 'negative_review', 'reviewer_check_in_date',
+    'review_created_date', 'length_nights_stay', 'apartment_type', 'review_feedback'
+]
+
+
+def _is_missing(value):
+    # None and pandas NaN/NaT/NA all behave as SQL NULL
+    if value is None:
+        return True
+    try:
+        return bool(value != value)
+    except TypeError:
+        # pd.NA refuses to be turned into a bool
+        return True
+
+
+def parse_review_date(value):
+    """Return a scraped or stored date as 'YYYY-MM-DD', or None if it is missing or unparseable."""
+    if _is_missing(value):
+        return None
+    if hasattr(value, 'strftime'):
+        return value.strftime('%Y-%m-%d')
+
+    text = str(value).strip()
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    return None
+
+
+def review_fingerprint(hotel_id, review):
+    """
+    Compute the identity the unique_review index gives a review.
+
+    Args:
+        hotel_id (str): Hotel the review belongs to
+        review (Mapping): Review fields, keyed by reviews table column name
+
+    Returns:
+        bytes: 16 byte digest, or None when hotel_id/reviewer_name is NULL (the index
+        treats NULLs as distinct, so such a review never counts as a duplicate)
+    """
+    reviewer_name = review.get('reviewer_name')
+    if _is_missing(hotel_id) or _is_missing(reviewer_name):
+        return None
+
+    def text(field):
+        value = review.get(field)
+        return '' if _is_missing(value) else str(value)
+
+    nights = review.get('length_nights_stay')
+
+    parts = [
+        str(hotel_id),
+        str(reviewer_name),
+        text('positive_review'),
+        text('negative_review'),
+        parse_review_date(review.get('reviewer_check_in_date')) or DEFAULT_DATE,
+        parse_review_date(review.get('review_created_date')) or DEFAULT_DATE,
+        str(DEFAULT_NIGHTS if _is_missing(nights) else int(nights)),
+        text('apartment_type'),
+        text('review_feedback'),
+    ]
+    return hashlib.blake2b('\x1f'.join(parts).encode('utf-8'), digest_size=16).digest()
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over 16 byte fingerprints.
+
+    The fingerprints are already uniform hashes, so the bit positions are derived from
+    their two 64 bit halves (double hashing) instead of hashing again.
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = capacity
+        self.num_bits = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, fingerprint):
+        h1 = int.from_bytes(fingerprint[:8], 'little')
+        h2 = int.from_bytes(fingerprint[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, fingerprint):
+        for position in self._positions(fingerprint):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, fingerprint):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(fingerprint))
+
+
+class FingerprintIndex:
+    """
+    Local on-disk set of the review fingerprints already stored for each hotel.
+
+    The exact set lives in SQLite (16 byte digests in a WITHOUT ROWID table). In front
+    of it each hotel gets an in-memory Bloom filter, built on first use, so reviews that
+    are new (the common case while scraping) are answered without touching the database.
+    """
+
+    DEFAULT_PATH = os.path.join('cache', 'review_fingerprints.sqlite')
+    MIN_BLOOM_CAPACITY = 10_000
+
+    def __init__(self, path=None):
+        self.path = path or self.DEFAULT_PATH
+        self.blooms = {}
+
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS fingerprints ('
+            'hotel_id TEXT NOT NULL, fingerprint BLOB NOT NULL, PRIMARY KEY (hotel_id, fingerprint)) WITHOUT ROWID'
+        )
+        self.conn.commit()
+
+    def bloom_for(self, hotel_id):
+        # build the hotel's filter from SQLite once, sized with room to grow
+        if hotel_id not in self.blooms:
+            rows = self.conn.execute('SELECT fingerprint FROM fingerprints WHERE hotel_id = ?', (hotel_id,)).fetchall()
+            bloom = BloomFilter(max(self.MIN_BLOOM_CAPACITY, 2 * len(rows)))
+            for (fingerprint,) in rows:
+                bloom.add(fingerprint)
+            self.blooms[hotel_id] = bloom
+
+        return self.blooms[hotel_id]
+
+    def contains_many(self, hotel_id, fingerprints):
+        # returns the subset of fingerprints that are already known for the hotel
+        bloom = self.bloom_for(hotel_id)
+        # only fingerprints the filter might hold need an exact lookup
+        candidates = list({fp for fp in fingerprints if fp is not None and fp in bloom})
+        known = set()
+
+        for i in range(0, len(candidates), 500):
+            chunk = candidates[i:i + 500]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self.conn.execute(
+                f'SELECT fingerprint FROM fingerprints WHERE hotel_id = ? AND fingerprint IN ({placeholders})',
+                [hotel_id, *chunk]
+            ).fetchall()
+            known.update(row[0] for row in rows)
+
+        return known
+
+    def add_many(self, hotel_id, fingerprints):
+        fingerprints = [fp for fp in fingerprints if fp is not None]
+        self.conn.executemany(
+            'INSERT OR IGNORE INTO fingerprints (hotel_id, fingerprint) VALUES (?, ?)',
+            [(hotel_id, fp) for fp in fingerprints]
+        )
+        self.conn.commit()
+
+        bloom = self.blooms.get(hotel_id)
+        if bloom is not None:
+            for fp in fingerprints:
+                bloom.add(fp)
+            # past its capacity the false positive rate climbs, rebuild it larger on next use
+            if bloom.count > bloom.capacity:
+                del self.blooms[hotel_id]
+
+    def new_mask(self, hotel_id, reviews):
+        # True for each review not stored yet and not repeated earlier in the same batch
+        fingerprints = [review_fingerprint(hotel_id, review) for review in reviews]
+        known = self.contains_many(hotel_id, fingerprints)
+
+        mask = []
+        for fingerprint in fingerprints:
+            is_new = fingerprint is None or fingerprint not in known
+            if fingerprint is not None:
+                known.add(fingerprint)
+            mask.append(is_new)
+
+        return mask
+
+    def filter_new(self, hotel_id, reviews):
+        """
+        Drop the reviews that are already stored, or repeated earlier in the same batch.
+
+        Args:
+            hotel_id (str): Hotel the reviews belong to
+            reviews (list): Review dicts keyed by reviews table column name
+
+        Returns:
+            list: The reviews not seen before, in their original order
+        """
+        return [review for review, is_new in zip(reviews, self.new_mask(hotel_id, reviews)) if is_new]
+
+    def filter_dataframe(self, df):
+        # same as filter_new for a whole frame, e.g. a saved CSV before translating it
+        keep = []
+        for hotel_id, hotel_df in df.groupby('hotel_id', observed=True, sort=False):
+            mask = self.new_mask(hotel_id, hotel_df.to_dict('records'))
+            keep.extend(index for index, is_new in zip(hotel_df.index, mask) if is_new)
+
+        return df.loc[df.index.isin(keep)]
+
+    def seed_from_db(self, conn, hotel_id=None):
+        """
+        Bulk load the fingerprints of reviews already in the reviews table.
+
+        The fingerprint columns are exported with COPY ... TO STDOUT, the fastest way to
+        get rows out of Postgres, spooled to disk and hashed in one pass.
+
+        Args:
+            conn: psycopg2 connection to the reviews database
+            hotel_id (str): Only seed this hotel, all hotels if None
+
+        Returns:
+            int: Number of rows read
+        """
+        query = f"SELECT {', '.join(FINGERPRINT_COLUMNS)} FROM reviews"
+        if hotel_id is not None:
+            with conn.cursor() as cursor:
+                query = cursor.mogrify(query + " WHERE hotel_id = %s", (hotel_id,)).decode('utf-8')
+
+        rows_read = 0
+        with tempfile.TemporaryFile('w+', encoding='utf-8', newline='') as spool:
+            with conn.cursor() as cursor:
+                cursor.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, NULL '\\N')", spool)
+            spool.seek(0)
+
+            by_hotel = {}
+            for row in csv.reader(spool):
+                review = dict(zip(FINGERPRINT_COLUMNS, [None if value == '\\N' else value for value in row]))
+                by_hotel.setdefault(review['hotel_id'], []).append(review_fingerprint(review['hotel_id'], review))
+                rows_read += 1
+
+        for row_hotel_id, fingerprints in by_hotel.items():
+            self.add_many(row_hotel_id, fingerprints)
+
+        return rows_read
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,134 @@
+import logging
+
+import pandas as pd
+
+from ReviewFingerprints import DATE_FORMATS
+from ScrapeMetrics import ScrapeMetrics
+
+# VARCHAR(n) columns of the reviews table
+VARCHAR_LIMITS = {
+    'hotel_id': 20,
+    'hotel_name': 255,
+    'source_name': 255,
+    'reviewer_name': 255,
+    'country': 100,
+    'sentiment': 50,
+    'apartment_type': 100,
+    'group_type': 100,
+}
+
+# columns that are part of a review's identity (unique_review index, fingerprints): a
+# truncated value would merge distinct hotels or reviews, so they are never cut
+IDENTITY_COLUMNS = ('hotel_id', 'reviewer_name', 'apartment_type')
+
+# low-cardinality columns stored as pandas categoricals
+CATEGORICAL_COLUMNS = ['hotel_id', 'hotel_name', 'source_name', 'country', 'sentiment', 'apartment_type', 'group_type']
+
+# review_rating is DECIMAL(4,2) and Booking.com scores run from 1 to 10
+RATING_SCALE = 2
+RATING_RANGE = (0, 10)
+
+
+def to_dates(values, formats=DATE_FORMATS):
+    """
+    Parse a column of date strings, trying each format on the rows still unparsed.
+
+    Every attempt is a single vectorized pd.to_datetime call over the remaining rows.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.dt.normalize()
+
+    text = values.astype('string').str.strip().str.replace(r'^Reviewed:\s*', '', regex=True)
+    dates = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+
+    for date_format in formats:
+        unparsed = dates.isna() & text.notna()
+        if not unparsed.any():
+            break
+        dates[unparsed] = pd.to_datetime(text[unparsed], format=date_format, errors='coerce')
+
+    return dates
+
+
+def to_ratings(values, metrics=None):
+    # "8.0", "8,0" and "Scored 8.0" all become 8.00, anything outside the scale is dropped
+    if not pd.api.types.is_numeric_dtype(values):
+        values = values.astype('string').str.extract(r'(\d+(?:[.,]\d+)?)\s*$', expand=False).str.replace(',', '.')
+
+    ratings = pd.to_numeric(values, errors='coerce').round(RATING_SCALE)
+    out_of_range = ratings.notna() & ~ratings.between(*RATING_RANGE)
+    if out_of_range.any():
+        metrics = metrics or ScrapeMetrics()
+        metrics.increment('ratings_dropped', int(out_of_range.sum()))
+        metrics.event('ratings_dropped', level=logging.WARNING, ratings=int(out_of_range.sum()), rating_range=RATING_RANGE)
+
+    return ratings.mask(out_of_range)
+
+
+def to_nights(values):
+    if not pd.api.types.is_numeric_dtype(values):
+        values = values.astype('string').str.extract(r'(\d+)', expand=False)
+    return pd.to_numeric(values, errors='coerce').astype('Int32')
+
+
+def fit_varchar_limits(df, metrics=None):
+    # free-text labels are cut to their column length, over-long identity values are an error
+    for column, limit in VARCHAR_LIMITS.items():
+        if column not in df:
+            continue
+        text = df[column].astype('string')
+        too_long = text.str.len() > limit
+        if not too_long.any():
+            df[column] = text
+            continue
+
+        if column in IDENTITY_COLUMNS:
+            raise ValueError(
+                f"{too_long.sum()} values of {column} are longer than VARCHAR({limit}), "
+                f"e.g. {text[too_long].iloc[0]!r}; identity columns are not truncated"
+            )
+        metrics = metrics or ScrapeMetrics()
+        metrics.increment('values_truncated', int(too_long.sum()), column=column)
+        metrics.event('values_truncated', level=logging.WARNING, column=column, values=int(too_long.sum()), limit=limit)
+        df[column] = text.str.slice(0, limit)
+
+
+def normalize_reviews(df, varchar_limits=True, metrics=None):
+    """
+    Convert a scraped review frame to the types of the reviews table, a column at a time.
+
+    Args:
+        df (pd.DataFrame): Frame from create_review_dataframe, a sink or a saved CSV
+        varchar_limits (bool): Fit text columns to the reviews table's VARCHAR lengths.
+            Label columns are truncated; an over-long hotel_id, reviewer_name or
+            apartment_type raises ValueError instead
+        metrics (ScrapeMetrics): Receives the dropped rating and truncation counts
+
+    Returns:
+        pd.DataFrame: Copy with numeric rating and nights, datetime date columns,
+        string VARCHAR columns and categorical low-cardinality columns
+    """
+    df = df.copy()
+
+    if 'review_rating' in df:
+        df['review_rating'] = to_ratings(df['review_rating'], metrics)
+    if 'length_nights_stay' in df:
+        df['length_nights_stay'] = to_nights(df['length_nights_stay'])
+    for column in ['reviewer_check_in_date', 'review_created_date']:
+        if column in df:
+            df[column] = to_dates(df[column])
+    if 'seen' in df:
+        df['seen'] = df['seen'].astype('boolean')
+
+    if varchar_limits:
+        fit_varchar_limits(df, metrics)
+    else:
+        for column in VARCHAR_LIMITS:
+            if column in df:
+                df[column] = df[column].astype('string')
+
+    for column in CATEGORICAL_COLUMNS:
+        if column in df:
+            df[column] = df[column].astype('category')
+
+    return df
@@ -0,0 +1,39 @@
+from typing import NamedTuple, Optional
+import pandas as pd
+
+
+class ReviewRecord(NamedTuple):
+    """One scraped review, laid out like the columns of the reviews table."""
+
+    hotel_id: str
+    hotel_name: str
+    source_name: str
+    positive_review: Optional[str]
+    negative_review: Optional[str]
+    review_rating: Optional[str]
+    reviewer_name: Optional[str]
+    country: Optional[str]
+    sentiment: Optional[str]
+    reviewer_check_in_date: Optional[str]
+    review_created_date: Optional[str]
+    apartment_type: Optional[str]
+    length_nights_stay: Optional[int]
+    group_type: Optional[str]
+    review_feedback: Optional[str]
+    seen: bool
+    review_text: Optional[str]
+    # filled in when a TranslationStage translated review_text
+    review_text_original: Optional[str] = None
+    review_language: Optional[str] = None
+
+
+# only present in outputs of scrapes that ran a TranslationStage
+TRANSLATION_FIELDS = ('review_text_original', 'review_language')
+# same columns, in the same order, as BookingComScraper.create_review_dataframe
+BASE_FIELDS = tuple(field for field in ReviewRecord._fields if field not in TRANSLATION_FIELDS)
+
+
+def records_to_dataframe(records, columns=ReviewRecord._fields):
+    # every field by default, `columns` picks a subset such as BASE_FIELDS
+    df = pd.DataFrame.from_records(list(records), columns=ReviewRecord._fields)
+    return df if tuple(columns) == ReviewRecord._fields else df[list(columns)]
@@ -0,0 +1,177 @@
+import csv
+import os
+
+from ReviewRecord import ReviewRecord, records_to_dataframe
+from ScrapeMetrics import ScrapeMetrics
+
+
+def check_csv_columns(filename, columns):
+    """
+    Make sure rows with `columns` can be appended to an existing CSV file.
+
+    Raises:
+        ValueError: The file's header lists other columns, appending would misalign them
+    """
+    if not os.path.exists(filename) or os.path.getsize(filename) == 0:
+        return
+
+    with open(filename, newline='', encoding='utf-8') as f:
+        header = next(csv.reader(f), [])
+    if header != list(columns):
+        raise ValueError(f"Can't append to '{filename}': its columns {header} differ from {list(columns)}")
+
+
+class ReviewSink:
+    """
+    Base class for destinations of the scraped review stream.
+
+    Records are buffered and handed to `write_batch` every `batch_size` records, so
+    memory stays bounded and everything up to the last flush survives a crash.
+    `persistent` sinks keep the records beyond the run, which is what lets the
+    scraper count them as known reviews, and sinks that `use_review_identity`
+    deduplicate on it, so they need every identity column scraped.
+    """
+
+    BATCH_SIZE = 500
+    persistent = True
+    uses_review_identity = False
+
+    def __init__(self, batch_size=None):
+        self.batch_size = batch_size or self.BATCH_SIZE
+        self.buffer = []
+        self.records_written = 0
+
+    def write(self, record):
+        self.buffer.append(record)
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def write_many(self, records):
+        for record in records:
+            self.write(record)
+
+    def flush(self):
+        if self.buffer:
+            self.write_batch(self.buffer)
+            self.records_written += len(self.buffer)
+            self.buffer = []
+
+    def write_batch(self, records):
+        raise NotImplementedError
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class RecordCollector(ReviewSink):
+    """Keeps every record in memory, for callers that want the whole result back."""
+
+    persistent = False
+
+    def __init__(self):
+        super().__init__(batch_size=1)
+        self.records = []
+
+    def write_batch(self, records):
+        self.records.extend(records)
+
+
+class CsvSink(ReviewSink):
+    """
+    Appends batches of records to a CSV file, writing the header once.
+
+    `columns` defaults to every ReviewRecord field. Appending to a file whose header
+    lists other columns raises ValueError instead of misaligning the rows.
+    """
+
+    def __init__(self, filename, overwrite=False, batch_size=None, columns=ReviewRecord._fields):
+        super().__init__(batch_size)
+        self.filename = filename
+        self.columns = tuple(columns)
+
+        if overwrite and os.path.exists(filename):
+            os.remove(filename)
+        check_csv_columns(filename, self.columns)
+
+    def write_batch(self, records):
+        write_header = not os.path.exists(self.filename) or os.path.getsize(self.filename) == 0
+        records_to_dataframe(records, self.columns).to_csv(self.filename, mode='a', header=write_header, index=False)
+
+
+class ParquetSink(ReviewSink):
+    """
+    Writes one hotel's records into the partitioned Parquet store (see ParquetStore):
+    a new part file per run, with one row group per batch.
+    """
+
+    BATCH_SIZE = 5000
+
+    def __init__(self, base_dir, scrape_date=None, if_exists='append', batch_size=None, metrics=None):
+        super().__init__(batch_size)
+        # pyarrow is only needed when Parquet output is used
+        import ParquetStore
+
+        self.store = ParquetStore
+        self.base_dir = base_dir
+        self.scrape_date = scrape_date
+        self.if_exists = if_exists
+        self.metrics = metrics or ScrapeMetrics()
+        self.path = None
+        self.writer = None
+        self.skipped = False
+
+    def open_writer(self, record):
+        # the partition is known once the first record arrives
+        partition_dir = self.store.partition_path(self.base_dir, record.source_name, record.hotel_id, self.scrape_date)
+        if not self.store.prepare_partition(partition_dir, self.if_exists):
+            self.metrics.increment('partitions_skipped')
+            self.metrics.event('partition_skipped', partition=partition_dir, if_exists=self.if_exists)
+            self.skipped = True
+            return
+
+        self.path = self.store.new_part_file(partition_dir)
+        self.writer = self.store.pq.ParquetWriter(self.path, self.store.REVIEW_ARROW_SCHEMA, compression='zstd')
+
+    @property
+    def persistent(self):
+        # records sent to a partition that was left alone were never stored
+        return not self.skipped
+
+    def write_batch(self, records):
+        if self.writer is None and not self.skipped:
+            self.open_writer(records[0])
+        if self.skipped:
+            return
+
+        self.writer.write_table(self.store.to_arrow_table(records_to_dataframe(records), self.metrics))
+
+    def close(self):
+        super().close()
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+class PostgresSink(ReviewSink):
+    """Loads each batch of records into the reviews table through PostgresLoader."""
+
+    # rows that hit the unique_review index are skipped
+    uses_review_identity = True
+
+    def __init__(self, loader, batch_size=None):
+        super().__init__(batch_size)
+        self.loader = loader
+        self.inserted = 0
+        self.skipped = 0
+
+    def write_batch(self, records):
+        result = self.loader.load(records_to_dataframe(records))
+        self.inserted += result['inserted']
+        self.skipped += result['skipped']
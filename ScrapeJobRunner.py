@@ -0,0 +1,208 @@
+import argparse
+import asyncio
+import csv
+import json
+import os
+import time
+
+from BookingComScraper import BookingComScraper
+from RateLimiter import DomainRateLimiter
+from ReviewSinks import CsvSink
+from ScrapeMetrics import ScrapeMetrics, configure_logging
+
+MANIFEST_FIELDS = ['url', 'hotel_id', 'hotel_name', 'source_name']
+
+
+def read_manifest(path):
+    """
+    Read the hotels to scrape from a CSV or JSONL manifest.
+
+    Each entry needs url, hotel_id, hotel_name and source_name; an optional
+    filename sets where that hotel's CSV is written.
+    """
+    if path.endswith('.jsonl'):
+        with open(path, encoding='utf-8') as f:
+            jobs = [json.loads(line) for line in f if line.strip()]
+    else:
+        with open(path, newline='', encoding='utf-8') as f:
+            jobs = list(csv.DictReader(f))
+
+    for line_num, job in enumerate(jobs, start=1):
+        missing = [field for field in MANIFEST_FIELDS if not job.get(field)]
+        if missing:
+            raise ValueError(f"Manifest entry {line_num} is missing {', '.join(missing)}")
+
+    return jobs
+
+
+def job_key(job):
+    return f"{job['source_name']}:{job['hotel_id']}"
+
+
+class ScrapeCheckpoint:
+    """
+    JSON state file recording finished hotels and the last finished page of the
+    ones in progress, so a restarted run picks up where the last one stopped.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.state = {'completed': {}, 'pages': {}}
+
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.state = json.load(f)
+
+    def save(self):
+        # write to a temp file first so a crash never leaves a half-written state file
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def is_completed(self, key):
+        return key in self.state['completed']
+
+    def last_page(self, key):
+        return self.state['pages'].get(key, 0)
+
+    def mark_page(self, key, page_num):
+        self.state['pages'][key] = max(page_num, self.last_page(key))
+        self.save()
+
+    def mark_completed(self, key, summary):
+        self.state['completed'][key] = summary
+        self.state['pages'].pop(key, None)
+        self.save()
+
+
+class ScrapeJobRunner:
+    """
+    Scrapes every hotel in a manifest with a pool of workers sharing one browser.
+
+    Page loads are throttled per domain, and finished hotels and pages are
+    checkpointed to a state file so an interrupted run can be resumed. Each hotel's
+    records go to the sinks of `sink_factory(job, append)`; `append` is set when the
+    hotel is resumed or known reviews are skipped, and then existing output must be kept.
+    """
+
+    NUM_WORKERS = 3
+    # politeness limit: page loads per domain every REQUEST_PERIOD seconds
+    REQUESTS_PER_PERIOD = 1
+    REQUEST_PERIOD = 2.0
+
+    def __init__(self, scraper=None, state_path='scrape_state.json', output_dir='output', num_workers=None, pages_per_hotel=1, sink_factory=None):
+        self.scraper = scraper or BookingComScraper(rate_limiter=DomainRateLimiter(self.REQUESTS_PER_PERIOD, self.REQUEST_PERIOD))
+        self.checkpoint = ScrapeCheckpoint(state_path)
+        self.output_dir = output_dir
+        self.num_workers = num_workers or self.NUM_WORKERS
+        self.pages_per_hotel = pages_per_hotel
+        self.sink_factory = sink_factory or self.csv_sinks
+        self.results = []
+
+    def csv_sinks(self, job, append):
+        # a resumed hotel keeps appending to the CSV it already started, and so does a run
+        # that skips known reviews: those are only known because this CSV holds them
+        filename = job.get('filename') or os.path.join(self.output_dir, f"{job['hotel_id']}.csv")
+        if os.path.dirname(filename):
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+        return [CsvSink(filename, overwrite=not append, columns=self.scraper.output_columns())]
+
+    async def run_job(self, job):
+        key = job_key(job)
+        start_page = self.checkpoint.last_page(key) + 1
+        resuming = start_page > 1
+        # without partner replies the fingerprints can't tell which reviews are known
+        skip_known = self.scraper.include_partner_replies
+        sinks = []
+        result = {'hotel_id': job['hotel_id'], 'hotel_name': job['hotel_name'], 'pages': 0, 'reviews': 0, 'error': None}
+
+        def on_page_done(page_num, num_reviews):
+            # flush before checkpointing so the state file never runs ahead of the output
+            for sink in sinks:
+                sink.flush()
+            self.checkpoint.mark_page(key, page_num)
+            result['pages'] += 1
+
+        if resuming:
+            self.scraper.metrics.event('job_resumed', hotel_id=job['hotel_id'], start_page=start_page)
+
+        started = time.perf_counter()
+        try:
+            # a sink that can't take this hotel's records (e.g. a CSV with other columns) fails the job
+            sinks.extend(self.sink_factory(job, resuming or skip_known))
+            result['reviews'] = await self.scraper.scrape_to_sinks(
+                job['url'], job['hotel_id'], job['hotel_name'], job['source_name'], sinks,
+                num_workers=self.pages_per_hotel,
+                skip_known=skip_known,
+                start_page=start_page,
+                on_page_done=on_page_done
+            )
+        except Exception as e:
+            self.scraper.metrics.error('scrape_job', e, hotel_id=job['hotel_id'])
+            result['error'] = str(e)
+
+        result['seconds'] = round(time.perf_counter() - started, 1)
+        result['reviews_per_second'] = round(result['reviews'] / result['seconds'], 2) if result['seconds'] else 0.0
+
+        if result['error'] is None:
+            self.checkpoint.mark_completed(key, result)
+        return result
+
+    async def worker(self, job_queue):
+        while True:
+            job = await job_queue.get()
+            try:
+                self.results.append(await self.run_job(job))
+            finally:
+                job_queue.task_done()
+
+    async def run(self, jobs):
+        pending_jobs = [job for job in jobs if not self.checkpoint.is_completed(job_key(job))]
+        self.scraper.metrics.event('jobs_started', done=len(jobs) - len(pending_jobs), pending=len(pending_jobs))
+
+        job_queue = asyncio.Queue()
+        for job in pending_jobs:
+            job_queue.put_nowait(job)
+
+        async with self.scraper.browser_session():
+            workers = [asyncio.create_task(self.worker(job_queue)) for _ in range(self.num_workers)]
+            await job_queue.join()
+            for worker in workers:
+                worker.cancel()
+
+        self.print_summary()
+        return self.results
+
+    def print_summary(self):
+        print('\nScrape summary:')
+        for result in self.results:
+            status = 'FAILED: ' + result['error'] if result['error'] else 'ok'
+            print(f"  {result['hotel_name']:<40} pages={result['pages']:<4} reviews={result['reviews']:<6} "
+                  f"{result['seconds']}s ({result['reviews_per_second']} reviews/s) {status}")
+
+        failures = sum(1 for result in self.results if result['error'])
+        print(f'{len(self.results) - failures} hotels scraped, {failures} failed')
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Scrape the reviews of every hotel in a manifest')
+    parser.add_argument('manifest', help='CSV or JSONL file with url, hotel_id, hotel_name, source_name')
+    parser.add_argument('--workers', type=int, default=ScrapeJobRunner.NUM_WORKERS, help='hotels scraped at the same time')
+    parser.add_argument('--pages-per-hotel', type=int, default=1, help='browser pages used for each hotel')
+    parser.add_argument('--state', default='scrape_state.json', help='checkpoint file used to resume')
+    parser.add_argument('--output-dir', default='output')
+    parser.add_argument('--skip-partner-replies', action='store_true', help='leave review_feedback empty instead of expanding the hotel replies; known reviews are then not skipped')
+    parser.add_argument('--metrics-file', help='Prometheus text file refreshed after every hotel (e.g. for the node_exporter textfile collector)')
+    parser.add_argument('--log-level', default='INFO', help='level of the JSON scrape events written to stderr')
+    args = parser.parse_args()
+
+    configure_logging(args.log_level.upper())
+    scraper = BookingComScraper(
+        metrics=ScrapeMetrics(prometheus_path=args.metrics_file),
+        rate_limiter=DomainRateLimiter(ScrapeJobRunner.REQUESTS_PER_PERIOD, ScrapeJobRunner.REQUEST_PERIOD),
+        include_partner_replies=not args.skip_partner_replies
+    )
+    runner = ScrapeJobRunner(scraper=scraper, state_path=args.state, output_dir=args.output_dir, num_workers=args.workers, pages_per_hotel=args.pages_per_hotel)
+    asyncio.run(runner.run(read_manifest(args.manifest)))
@@ -0,0 +1,178 @@
+import datetime
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+logger = logging.getLogger('booking_scraper')
+
+
+class JsonLogFormatter(logging.Formatter):
+    """Formats each log record as one JSON object per line, with the event's fields at the top level."""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname.lower(),
+            'event': record.getMessage(),
+        }
+        entry.update(getattr(record, 'fields', {}))
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def configure_logging(level=logging.INFO, stream=None):
+    # structured scrape events go to stderr (or `stream`) as JSON lines
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JsonLogFormatter())
+    logger.handlers = [handler]
+    logger.setLevel(level)
+    logger.propagate = False
+
+
+def metric_key(name, labels):
+    # counters are keyed Prometheus style, e.g. missing_fields{field="country"}
+    if not labels:
+        return name
+    escape = lambda value: str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    label_text = ','.join(f'{label}="{escape(value)}"' for label, value in sorted(labels.items()))
+    return f'{name}{{{label_text}}}'
+
+
+class LatencyHistogram:
+    """
+    Fixed-bucket latency histogram (seconds), so memory stays constant however many
+    observations are recorded.
+    """
+
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, float('inf'))
+
+    def __init__(self):
+        self.bucket_counts = [0] * len(self.BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        for i, upper_bound in enumerate(self.BUCKETS):
+            if seconds <= upper_bound:
+                self.bucket_counts[i] += 1
+                break
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q):
+        # upper bound of the bucket holding the q-th observation (the max for the open bucket)
+        if not self.count:
+            return 0.0
+
+        cumulative = 0
+        for upper_bound, bucket_count in zip(self.BUCKETS, self.bucket_counts):
+            cumulative += bucket_count
+            if cumulative >= q * self.count:
+                return min(upper_bound, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'total_s': round(self.total, 3),
+            'mean_s': round(self.total / self.count, 3) if self.count else 0.0,
+            'p50_s': self.quantile(0.5),
+            'p95_s': self.quantile(0.95),
+            'max_s': round(self.max, 3),
+        }
+
+
+class ScrapeMetrics:
+    """
+    Per-step latency histograms, counters and structured events for a scrape run.
+
+    Counters can carry labels (`increment('missing_fields', field='country')`), events
+    are logged as JSON lines on the 'booking_scraper' logger, and the whole set can be
+    written in the Prometheus text format for node_exporter's textfile collector.
+    Set `prometheus_path` (or SCRAPE_METRICS_FILE) to have `export()` write it.
+
+    Usage:
+        with metrics.time_step('navigate_page'):
+            await scraper.go_to_review_page(page, current_page, page_num)
+        metrics.event('page_scraped', page=page_num, cards=len(reviews))
+    """
+
+    METRIC_PREFIX = 'booking_scraper'
+
+    def __init__(self, prometheus_path=None):
+        self.histograms = defaultdict(LatencyHistogram)
+        self.counters = defaultdict(int)
+        self.prometheus_path = prometheus_path or os.getenv('SCRAPE_METRICS_FILE')
+
+        # keep the events visible when the application has not configured logging
+        if not logger.handlers and not logging.getLogger().handlers:
+            configure_logging()
+
+    def increment(self, name, amount=1, **labels):
+        self.counters[metric_key(name, labels)] += amount
+
+    def event(self, name, level=logging.INFO, **fields):
+        logger.log(level, name, extra={'fields': fields})
+
+    def error(self, stage, error, **fields):
+        # count the failure by stage and exception type, and log it with its message
+        self.increment('errors', stage=stage, type=type(error).__name__)
+        self.event('error', level=logging.ERROR, stage=stage, error_type=type(error).__name__, error=str(error), **fields)
+
+    @contextmanager
+    def time_step(self, step):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.histograms[step].observe(time.perf_counter() - start)
+
+    def summary(self):
+        return {step: histogram.summary() for step, histogram in self.histograms.items()}
+
+    def to_prometheus(self):
+        """Render the counters and step histograms in the Prometheus text exposition format."""
+        lines = []
+
+        counters_by_name = defaultdict(list)
+        for key, value in sorted(self.counters.items()):
+            name, _, label_text = key.partition('{')
+            counters_by_name[name].append((f'{{{label_text}' if label_text else '', value))
+
+        for name, series in counters_by_name.items():
+            metric = f'{self.METRIC_PREFIX}_{name}_total'
+            lines.append(f'# TYPE {metric} counter')
+            lines.extend(f'{metric}{labels} {value}' for labels, value in series)
+
+        metric = f'{self.METRIC_PREFIX}_step_duration_seconds'
+        if self.histograms:
+            lines.append(f'# TYPE {metric} histogram')
+        for step, histogram in sorted(self.histograms.items()):
+            cumulative = 0
+            for upper_bound, bucket_count in zip(histogram.BUCKETS, histogram.bucket_counts):
+                cumulative += bucket_count
+                le = '+Inf' if upper_bound == float('inf') else repr(upper_bound)
+                lines.append(f'{metric}_bucket{{step="{step}",le="{le}"}} {cumulative}')
+            lines.append(f'{metric}_sum{{step="{step}"}} {histogram.total}')
+            lines.append(f'{metric}_count{{step="{step}"}} {histogram.count}')
+
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        # write next to the target and rename, so a collector never reads a half-written file
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+        os.replace(temp_path, path)
+
+    def export(self):
+        # end-of-run hook: log the step summary and refresh the Prometheus file if one is set
+        self.event('metrics_summary', counters=dict(self.counters), steps=self.summary())
+        if self.prometheus_path:
+            self.write_prometheus(self.prometheus_path)
@@ -0,0 +1,64 @@
+from dataclasses import dataclass
+from urllib.parse import urlparse
+
+
+@dataclass
+class ScrapeProfile:
+    """
+    Browser settings for a scrape run.
+
+    The default profile runs headless and aborts requests the scraper never needs:
+    images, media and fonts, known ad/tracking domains, and scripts served from
+    outside the first-party domains.
+    """
+
+    headless: bool = True
+    blocked_resource_types: tuple = ('image', 'media', 'font')
+    blocked_domains: tuple = (
+        'doubleclick.net', 'googletagmanager.com', 'google-analytics.com', 'googlesyndication.com',
+        'facebook.net', 'facebook.com', 'hotjar.com', 'criteo.com', 'bing.com', 'tiktok.com',
+    )
+    block_third_party_scripts: bool = True
+    first_party_domains: tuple = ('booking.com', 'bstatic.com')
+    locale: str = 'en-GB'
+    user_agent: str = None
+    viewport_width: int = 1280
+    viewport_height: int = 900
+
+    @property
+    def blocks_requests(self):
+        return bool(self.blocked_resource_types or self.blocked_domains or self.block_third_party_scripts)
+
+    def launch_options(self):
+        return {'headless': self.headless}
+
+    def context_options(self):
+        options = {
+            'locale': self.locale,
+            'viewport': {'width': self.viewport_width, 'height': self.viewport_height},
+        }
+        if self.user_agent:
+            options['user_agent'] = self.user_agent
+        return options
+
+    def is_first_party(self, host):
+        return any(host == domain or host.endswith('.' + domain) for domain in self.first_party_domains)
+
+    def should_block(self, resource_type, url):
+        if resource_type in self.blocked_resource_types:
+            return True
+
+        host = urlparse(url).hostname or ''
+        if any(host == domain or host.endswith('.' + domain) for domain in self.blocked_domains):
+            return True
+
+        return self.block_third_party_scripts and resource_type == 'script' and not self.is_first_party(host)
+
+
+# loads everything in a visible window, like the scraper did originally (useful for debugging selectors)
+FULL_BROWSER_PROFILE = ScrapeProfile(
+    headless=False,
+    blocked_resource_types=(),
+    blocked_domains=(),
+    block_third_party_scripts=False,
+)
@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+
+
+class SelectorRegistry:
+    """
+    Ordered CSS selector candidates for every element the scraper reads.
+
+    The candidates live in review_selectors.json: "page" holds selectors used on
+    the whole page (review cards, pagination, buttons) and "card" holds the fields
+    read inside each review card. Candidates are listed in order of preference,
+    data-testid selectors first, and the scraper picks the first one that matches
+    the first time it sees the element. That choice is used for the rest of the
+    run and saved to `cache_path`, keyed by the registry's version and content,
+    so the next run tries the last working selector first.
+    """
+
+    DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'review_selectors.json')
+    DEFAULT_CACHE_PATH = os.path.join('cache', 'selector_choices.json')
+
+    def __init__(self, path=None, cache_path=None):
+        self.path = path or self.DEFAULT_PATH
+        self.cache_path = cache_path or self.DEFAULT_CACHE_PATH
+
+        with open(self.path, 'rb') as f:
+            raw = f.read()
+        registry = json.loads(raw)
+
+        self.version = registry['version']
+        # the content hash catches edits that forgot to bump the version
+        self.fingerprint = f"{self.version}:{hashlib.sha1(raw).hexdigest()[:12]}"
+        self.page_candidates = registry['page']
+        self.card_candidates = registry['card']
+
+        # selector chosen for each name during this run
+        self.chosen = {}
+        self.previous_choices = self.load_previous_choices()
+
+    @property
+    def card_fields(self):
+        return list(self.card_candidates)
+
+    def candidates(self, name):
+        candidates = self.page_candidates.get(name) or self.card_candidates[name]
+        previous = self.previous_choices.get(name)
+        # last run's working selector goes first, the rest keep their order
+        if previous in candidates:
+            return [previous] + [selector for selector in candidates if selector != previous]
+        return list(candidates)
+
+    def selector(self, name):
+        """The chosen selector, or every candidate as one CSS selector list until one is chosen."""
+        return self.chosen.get(name) or ', '.join(self.candidates(name))
+
+    def card_selectors(self):
+        # what the in-page extraction tries per card field: the choice, or all candidates
+        return {
+            name: [self.chosen[name]] if name in self.chosen else self.candidates(name)
+            for name in self.card_candidates
+        }
+
+    def remember(self, choices):
+        """
+        Record the selectors found to work.
+
+        Args:
+            choices (dict): name -> selector that matched, None where nothing matched
+
+        Returns:
+            dict: The choices that were new for this run, name -> (selector, is_fallback)
+        """
+        new_choices = {}
+        for name, selector in choices.items():
+            if selector is None or name in self.chosen:
+                continue
+            self.chosen[name] = selector
+            preferred = (self.page_candidates.get(name) or self.card_candidates[name])[0]
+            new_choices[name] = (selector, selector != preferred)
+
+        if new_choices:
+            self.save_choices()
+        return new_choices
+
+    def load_previous_choices(self):
+        if not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, encoding='utf-8') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+        # choices made against another version of the registry are not trusted
+        if cached.get('registry') != self.fingerprint:
+            return {}
+        return cached.get('choices', {})
+
+    def save_choices(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+        temp_path = f'{self.cache_path}.{os.getpid()}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'registry': self.fingerprint, 'choices': {**self.previous_choices, **self.chosen}}, f, indent=2)
+        os.replace(temp_path, self.cache_path)
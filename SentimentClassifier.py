@@ -0,0 +1,201 @@
+import asyncio
+import json
+import random
+import logging
+import re
+from anthropic import AsyncAnthropic, APIConnectionError, APIStatusError, OverloadedError, RateLimitError
+
+from RateLimiter import RateLimiter
+from ScrapeMetrics import ScrapeMetrics
+
+SENTIMENT_LABELS = ('anger', 'disgust', 'fear', 'joy', 'neutral', 'sadness', 'surprise')
+
+
+class SentimentBackend:
+    """
+    Interface shared by the sentiment backends: `classify` takes a list of review texts
+    and returns one label from SENTIMENT_LABELS (or None) per text.
+    """
+
+    async def classify(self, texts):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class SentimentClassifier(SentimentBackend):
+    """
+    Classifies review texts into one of SENTIMENT_LABELS with Claude.
+
+    Reviews are sent in batches (several numbered reviews per request), batches run
+    concurrently behind a shared rate limiter, and failed requests are retried with
+    exponential backoff. One AsyncAnthropic client is reused for every request, and
+    `base_url` can point it at a local stub server. When a ResultCache is given,
+    previously classified texts are answered from it without an API call. Requests,
+    retries, tokens and errors are recorded on `metrics`.
+    """
+
+    MODEL = "claude-3-opus-20240229"
+    BATCH_SIZE = 20
+    MAX_CONCURRENCY = 4
+    REQUESTS_PER_MINUTE = 50
+    MAX_RETRIES = 5
+    BACKOFF_SECONDS = 1.0
+
+    # every 5xx is retried too (see is_retryable), 529 Overloaded is not an InternalServerError
+    RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, OverloadedError)
+
+    # identifies the classification task in ResultCache keys
+    CACHE_PROMPT = "sentiment:" + ",".join(SENTIMENT_LABELS)
+
+    def __init__(self, api_key=None, model=None, base_url=None, batch_size=None, max_concurrency=None, requests_per_minute=None, max_retries=None, cache=None, metrics=None):
+        self.api_key = api_key
+        self.model = model or self.MODEL
+        self.base_url = base_url
+        self.batch_size = batch_size or self.BATCH_SIZE
+        self.max_concurrency = max_concurrency or self.MAX_CONCURRENCY
+        self.requests_per_minute = requests_per_minute or self.REQUESTS_PER_MINUTE
+        self.max_retries = self.MAX_RETRIES if max_retries is None else max_retries
+        self.cache = cache
+        self.metrics = metrics or ScrapeMetrics()
+
+        self.client = None
+        self.rate_limiter = None
+        self.semaphore = None
+
+    def _ensure_client(self):
+        # the client and asyncio primitives are created lazily inside the running loop
+        if self.client is None:
+            self.client = AsyncAnthropic(api_key=self.api_key, base_url=self.base_url, max_retries=0)
+            self.rate_limiter = RateLimiter(self.requests_per_minute, period=60)
+            self.semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.close()
+            self.client = None
+
+    def build_prompt(self, texts):
+        numbered_reviews = "\n".join(f"{i + 1}. {text}" for i, text in enumerate(texts))
+        labels = ", ".join(SENTIMENT_LABELS)
+
+        return (
+            f"For each numbered hotel review below, pick the sentiment that fits it best from: {labels}.\n"
+            f"Answer with ONLY a JSON array of {len(texts)} lowercase labels, in the same order as the reviews. NO OTHER WORDS.\n\n"
+            f"Reviews:\n{numbered_reviews}"
+        )
+
+    def parse_labels(self, response_text, expected):
+        # pull the JSON array out of the response and check it lines up with the batch
+        match = re.search(r'\[.*\]', response_text, re.DOTALL)
+        if not match:
+            raise ValueError(f"No label array in response: {response_text!r}")
+
+        labels = [str(label).strip().lower() for label in json.loads(match.group(0))]
+        if len(labels) != expected:
+            raise ValueError(f"Expected {expected} labels, got {len(labels)}")
+
+        return [label if label in SENTIMENT_LABELS else None for label in labels]
+
+    async def _request(self, texts):
+        self._ensure_client()
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self.semaphore:
+                    await self.rate_limiter.acquire()
+                    with self.metrics.time_step('sentiment_request'):
+                        message = await self.client.messages.create(
+                            model=self.model,
+                            max_tokens=10 * len(texts) + 20,
+                            messages=[{"role": "user", "content": self.build_prompt(texts)}]
+                        )
+                self.metrics.increment('llm_requests', backend='sentiment')
+                self.metrics.increment('llm_tokens', message.usage.input_tokens, backend='sentiment', kind='input')
+                self.metrics.increment('llm_tokens', message.usage.output_tokens, backend='sentiment', kind='output')
+                return self.parse_labels(message.content[0].text, len(texts))
+
+            except (APIStatusError, APIConnectionError) as e:
+                if not self.is_retryable(e) or attempt == self.max_retries:
+                    raise
+                delay = self.BACKOFF_SECONDS * 2 ** attempt + random.uniform(0, self.BACKOFF_SECONDS)
+                self.metrics.increment('llm_retries', backend='sentiment', type=type(e).__name__)
+                self.metrics.event('llm_retry', level=logging.WARNING, backend='sentiment', error=str(e), delay_s=round(delay, 1))
+                await asyncio.sleep(delay)
+
+    def is_retryable(self, error):
+        if isinstance(error, self.RETRYABLE_ERRORS):
+            return True
+        return isinstance(error, APIStatusError) and error.status_code >= 500
+
+    async def classify_batch(self, texts):
+        try:
+            return await self._request(texts)
+        except (APIStatusError, APIConnectionError) as e:
+            # out of retries or not retryable: these reviews stay unclassified, the scrape goes on
+            self.metrics.error('sentiment', e, batch_size=len(texts))
+            return [None] * len(texts)
+        except ValueError as e:
+            if len(texts) == 1:
+                self.metrics.error('sentiment', e)
+                return [None]
+
+            # a malformed batch answer falls back to classifying each review on its own
+            self.metrics.increment('llm_batch_splits', backend='sentiment')
+            self.metrics.event('llm_batch_split', level=logging.WARNING, backend='sentiment', batch_size=len(texts), error=str(e))
+            single_labels = await asyncio.gather(*[self.classify_batch([text]) for text in texts])
+            return [labels[0] for labels in single_labels]
+
+    async def classify(self, texts):
+        """
+        Classify many review texts concurrently.
+
+        Args:
+            texts (list): Review texts, None entries are passed through as None
+
+        Returns:
+            list: One label from SENTIMENT_LABELS (or None) per input text
+        """
+        cached = self.cache.get_many(texts, self.CACHE_PROMPT, self.model) if self.cache else {}
+        to_classify = [(i, text) for i, text in enumerate(texts) if text and text not in cached]
+        batches = [to_classify[i:i + self.batch_size] for i in range(0, len(to_classify), self.batch_size)]
+
+        batch_labels = await asyncio.gather(*[
+            self.classify_batch([text for _, text in batch]) for batch in batches
+        ])
+
+        sentiments = [cached.get(text) for text in texts]
+        new_labels = {}
+        for batch, labels in zip(batches, batch_labels):
+            for (i, text), label in zip(batch, labels):
+                sentiments[i] = label
+                new_labels[text] = label
+
+        if self.cache:
+            self.cache.set_many(new_labels, self.CACHE_PROMPT, self.model)
+
+        return sentiments
+
+
+def get_sentiment_backend(name='claude', **options):
+    """
+    Build a sentiment backend by name.
+
+    Args:
+        name (str): 'claude' for the Anthropic API, 'local' for the offline transformer model
+        **options: Passed on to the backend's constructor
+
+    Returns:
+        SentimentBackend: The configured backend
+    """
+    if name == 'claude':
+        return SentimentClassifier(**options)
+
+    if name == 'local':
+        # imported here so the Claude backend works without torch/transformers installed
+        from LocalSentimentClassifier import LocalSentimentClassifier
+        options.pop('api_key', None)
+        return LocalSentimentClassifier(**options)
+
+    raise ValueError(f"Unknown sentiment backend: {name}")
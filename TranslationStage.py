@@ -0,0 +1,205 @@
+import asyncio
+import json
+import random
+import logging
+import re
+from langdetect import DetectorFactory, LangDetectException, detect
+from openai import AsyncOpenAI, APIConnectionError, InternalServerError, RateLimitError
+
+from RateLimiter import RateLimiter
+from ScrapeMetrics import ScrapeMetrics
+
+# make langdetect deterministic, it samples randomly by default
+DetectorFactory.seed = 0
+
+UNKNOWN_LANGUAGE = 'unknown'
+
+
+class TranslationStage:
+    """
+    Detects the language of review texts and translates the non-English ones.
+
+    Detection runs once per distinct text in a worker thread. Texts are grouped by
+    language and sent several per request, requests run concurrently behind a rate
+    limiter and are retried with backoff, and a ResultCache (shared with the
+    csv_to_postgres notebook) skips texts that were translated before. Texts whose
+    language cannot be detected are reported as 'unknown' rather than assumed English.
+    Requests, retries, tokens and errors are recorded on `metrics`.
+    """
+
+    MODEL = "gpt-3.5-turbo"
+    SYSTEM_PROMPT = "You are a helpful AI that translates text to English."
+    TARGET_LANGUAGE = 'en'
+    BATCH_SIZE = 20
+    MAX_CONCURRENCY = 4
+    REQUESTS_PER_MINUTE = 60
+    MAX_RETRIES = 5
+    BACKOFF_SECONDS = 1.0
+
+    RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, InternalServerError)
+
+    def __init__(self, api_key=None, model=None, base_url=None, cache=None, batch_size=None, max_concurrency=None, requests_per_minute=None, translate_unknown=False, metrics=None):
+        self.api_key = api_key
+        self.model = model or self.MODEL
+        self.base_url = base_url
+        self.cache = cache
+        self.batch_size = batch_size or self.BATCH_SIZE
+        self.max_concurrency = max_concurrency or self.MAX_CONCURRENCY
+        self.requests_per_minute = requests_per_minute or self.REQUESTS_PER_MINUTE
+        self.translate_unknown = translate_unknown
+        self.metrics = metrics or ScrapeMetrics()
+
+        self.client = None
+        self.rate_limiter = None
+        self.semaphore = None
+
+    def _ensure_client(self):
+        if self.client is None:
+            self.client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0)
+            self.rate_limiter = RateLimiter(self.requests_per_minute, period=60)
+            self.semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.close()
+            self.client = None
+
+    @staticmethod
+    def detection_text(text):
+        # review_text is "Positive: ... negative: ...", the English scaffolding would bias detection
+        text = re.sub(r'^Positive: |(?<= )negative: ', ' ', str(text))
+        return re.sub(r'\bNone\b', ' ', text).strip()
+
+    def detect_languages(self, texts):
+        """Return the detected language code of each text ('unknown' when detection fails)."""
+        detected = {}
+        for text in set(texts):
+            if text is None:
+                continue
+            try:
+                detected[text] = detect(self.detection_text(text))
+            except LangDetectException:
+                detected[text] = UNKNOWN_LANGUAGE
+
+        return [detected.get(text) for text in texts]
+
+    def needs_translation(self, language):
+        if language is None or language == self.TARGET_LANGUAGE:
+            return False
+        return language != UNKNOWN_LANGUAGE or self.translate_unknown
+
+    def build_prompt(self, texts, language):
+        return (
+            f"Translate each of the following {len(texts)} texts (language code '{language}') to English.\n"
+            f"Answer with ONLY a JSON array of {len(texts)} strings holding the translations, in the same order.\n\n"
+            f"{json.dumps(texts, ensure_ascii=False)}"
+        )
+
+    def parse_translations(self, response_text, expected):
+        match = re.search(r'\[.*\]', response_text, re.DOTALL)
+        if not match:
+            raise ValueError(f"No translation array in response: {response_text[:200]!r}")
+
+        translations = [str(translation).strip() for translation in json.loads(match.group(0))]
+        if len(translations) != expected:
+            raise ValueError(f"Expected {expected} translations, got {len(translations)}")
+        return translations
+
+    async def _request(self, texts, language):
+        self._ensure_client()
+        # a single text uses the notebook's plain prompt and answer
+        if len(texts) == 1:
+            content = f"Translate the following text to English:\n\n{texts[0]}"
+        else:
+            content = self.build_prompt(texts, language)
+
+        for attempt in range(self.MAX_RETRIES + 1):
+            try:
+                async with self.semaphore:
+                    await self.rate_limiter.acquire()
+                    with self.metrics.time_step('translation_request'):
+                        response = await self.client.chat.completions.create(
+                            model=self.model,
+                            messages=[
+                                {"role": "system", "content": self.SYSTEM_PROMPT},
+                                {"role": "user", "content": content}
+                            ],
+                            temperature=0.3,
+                            max_tokens=min(4096, len(content) // 2 + 200),
+                        )
+                self.metrics.increment('llm_requests', backend='translation')
+                if response.usage is not None:
+                    self.metrics.increment('llm_tokens', response.usage.prompt_tokens, backend='translation', kind='input')
+                    self.metrics.increment('llm_tokens', response.usage.completion_tokens, backend='translation', kind='output')
+                answer = response.choices[0].message.content.strip()
+                return [answer] if len(texts) == 1 else self.parse_translations(answer, len(texts))
+
+            except self.RETRYABLE_ERRORS as e:
+                if attempt == self.MAX_RETRIES:
+                    raise
+                delay = self.BACKOFF_SECONDS * 2 ** attempt + random.uniform(0, self.BACKOFF_SECONDS)
+                self.metrics.increment('llm_retries', backend='translation', type=type(e).__name__)
+                self.metrics.event('llm_retry', level=logging.WARNING, backend='translation', error=str(e), delay_s=round(delay, 1))
+                await asyncio.sleep(delay)
+
+    async def translate_batch(self, texts, language):
+        try:
+            return await self._request(texts, language)
+        except ValueError as e:
+            # a malformed batch answer falls back to one request per text
+            self.metrics.increment('llm_batch_splits', backend='translation')
+            self.metrics.event('llm_batch_split', level=logging.WARNING, backend='translation', batch_size=len(texts), error=str(e))
+            single_translations = await asyncio.gather(*[self.translate_batch([text], language) for text in texts])
+            return [translations[0] for translations in single_translations]
+        except Exception as e:
+            self.metrics.error('translation', e, language=language)
+            return [None] * len(texts)
+
+    async def translate_texts(self, texts):
+        """
+        Translate the non-English texts in a list.
+
+        Args:
+            texts (list): Texts to translate, None entries are passed through
+
+        Returns:
+            tuple: (translated texts, detected language per text); texts that are
+            English, undetected or failed to translate are returned unchanged
+        """
+        languages = await asyncio.to_thread(self.detect_languages, texts)
+
+        to_translate = {text: language for text, language in zip(texts, languages) if self.needs_translation(language)}
+        cached = self.cache.get_many(list(to_translate), self.SYSTEM_PROMPT, self.model) if self.cache else {}
+
+        # group the remaining distinct texts by language so each request holds one language
+        by_language = {}
+        for text, language in to_translate.items():
+            if text not in cached:
+                by_language.setdefault(language, []).append(text)
+
+        batches = [
+            (language, language_texts[i:i + self.batch_size])
+            for language, language_texts in by_language.items()
+            for i in range(0, len(language_texts), self.batch_size)
+        ]
+        batch_translations = await asyncio.gather(*[self.translate_batch(batch, language) for language, batch in batches])
+
+        new_translations = {}
+        for (_, batch), translations in zip(batches, batch_translations):
+            new_translations.update((text, translation) for text, translation in zip(batch, translations) if translation)
+
+        if self.cache:
+            self.cache.set_many(new_translations, self.SYSTEM_PROMPT, self.model)
+
+        translated = {**cached, **new_translations}
+        return [translated.get(text, text) for text in texts], languages
+
+    async def translate_dataframe(self, df, column='review_text'):
+        # keep the original text next to the translation
+        translations, languages = await self.translate_texts(df[column].where(df[column].notna(), None).tolist())
+
+        df = df.copy()
+        df[f'{column}_original'] = df[column]
+        df['review_language'] = languages
+        df[column] = translations
+        return df
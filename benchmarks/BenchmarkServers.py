@@ -0,0 +1,270 @@
+import html
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+class BackgroundServer:
+    """
+    Runs an HTTP handler on a free localhost port in a daemon thread.
+
+    Usage:
+        with ReviewFixtureSite(num_pages=10) as site:
+            url = site.hotel_url('bench-hotel')
+    """
+
+    def __init__(self):
+        self.server = None
+        self.thread = None
+        self.lock = threading.Lock()
+        self.counters = defaultdict(int)
+
+    def handle(self, request):
+        raise NotImplementedError
+
+    def increment(self, name, amount=1):
+        # handlers run on the server's threads
+        with self.lock:
+            self.counters[name] += amount
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        owner = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                owner.handle(self)
+
+            def do_POST(self):
+                owner.handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    @staticmethod
+    def respond(request, body, content_type='text/html; charset=utf-8', status=200):
+        payload = body.encode('utf-8')
+        request.send_response(status)
+        request.send_header('Content-Type', content_type)
+        request.send_header('Content-Length', str(len(payload)))
+        request.end_headers()
+        request.wfile.write(payload)
+
+
+class ReviewFixtureSite(BackgroundServer):
+    """
+    Serves a hotel page whose review panel behaves like booking.com's.
+
+    `/hotel/<slug>.html` is the page the scraper opens and `/hotel/<slug>/reviews?page=N`
+    returns one page of review cards plus the pagination, built from
+    fixtures/sample_reviews.json with the class names and data-testids the scraper's
+    selectors expect. A saved review page at fixtures/<slug>/page_<N>.html (with the
+    same `.review-cards` and `.review-pagination` wrappers) is served instead of the
+    generated one, so pages recorded from the live site can be replayed.
+
+    `page_latency` (seconds) delays every review page response and `reply_delay_ms`
+    is how long a partner reply takes to show up after its toggle is clicked.
+    """
+
+    CARDS_PER_PAGE = 10
+    # page buttons rendered either side of the current page, like the live pagination
+    PAGINATION_WINDOW = 2
+
+    def __init__(self, num_pages=10, cards_per_page=None, page_latency=0.0, reply_delay_ms=100, fixture_dir=FIXTURE_DIR):
+        super().__init__()
+        self.num_pages = num_pages
+        self.cards_per_page = cards_per_page or self.CARDS_PER_PAGE
+        self.page_latency = page_latency
+        self.reply_delay_ms = reply_delay_ms
+        self.fixture_dir = fixture_dir
+
+        with open(os.path.join(fixture_dir, 'hotel.html'), encoding='utf-8') as f:
+            self.hotel_template = f.read()
+        with open(os.path.join(fixture_dir, 'sample_reviews.json'), encoding='utf-8') as f:
+            self.sample_reviews = json.load(f)
+
+    def hotel_url(self, slug):
+        return f'{self.base_url}/hotel/{slug}.html'
+
+    def handle(self, request):
+        url = urlparse(request.path)
+
+        hotel_match = re.fullmatch(r'/hotel/([\w-]+)\.html', url.path)
+        if hotel_match:
+            self.increment('hotel_pages')
+            self.respond(request, self.render_hotel_page(hotel_match.group(1)))
+            return
+
+        reviews_match = re.fullmatch(r'/hotel/([\w-]+)/reviews', url.path)
+        if reviews_match:
+            page_num = int(parse_qs(url.query).get('page', ['1'])[0])
+            self.increment('review_pages')
+            if self.page_latency:
+                time.sleep(self.page_latency)
+            self.respond(request, self.render_review_page(reviews_match.group(1), page_num))
+            return
+
+        self.respond(request, 'not found', content_type='text/plain', status=404)
+
+    def render_hotel_page(self, slug):
+        return (self.hotel_template
+                .replace('__HOTEL_NAME__', html.escape(slug.replace('-', ' ').title()))
+                .replace('__REVIEW_PAGE_PATH__', f'/hotel/{slug}/reviews')
+                .replace('__REPLY_DELAY_MS__', str(int(self.reply_delay_ms))))
+
+    def render_review_page(self, slug, page_num):
+        recorded_page = os.path.join(self.fixture_dir, slug, f'page_{page_num}.html')
+        if os.path.exists(recorded_page):
+            with open(recorded_page, encoding='utf-8') as f:
+                return f.read()
+
+        first_card = (page_num - 1) * self.cards_per_page
+        cards = ''.join(self.render_card(first_card + i) for i in range(self.cards_per_page))
+        return f'<div class="review-cards">{cards}</div><div class="review-pagination">{self.render_pagination(page_num)}</div>'
+
+    def render_card(self, card_num):
+        review = self.sample_reviews[card_num % len(self.sample_reviews)]
+        esc = lambda value: html.escape(str(value))
+
+        # the card number keeps every review text distinct, so the LLM cache can't hide calls
+        positive = f'{review["positive"]} #{card_num}' if review['positive'] else None
+        parts = [
+            f'<div class="a3332d346a e6208ee469">{esc(review["reviewer_name"])}</div>',
+            f'<span class="afac1f68d9 a1ad95c055">{esc(review["country"])}</span>',
+            f'<span data-testid="review-room-name">{esc(review["apartment_type"])}</span>',
+            f'<span data-testid="review-num-nights">{review["nights"]} nights</span>',
+            f'<span data-testid="review-stay-date">{esc(review["stay_date"])}</span>',
+            f'<span data-testid="review-traveler-type">{esc(review["group_type"])}</span>',
+            f'<span data-testid="review-date">Reviewed: {esc(review["review_date"])}</span>',
+            f'<div class="a3b8729ab1 d86cee9b25">Scored {esc(review["rating"])}</div>',
+        ]
+        if positive:
+            parts.append(f'<div data-testid="review-positive-text"><span>Liked</span><span>{esc(positive)}</span></div>')
+        if review['negative']:
+            parts.append(f'<div data-testid="review-negative-text"><span>Disliked</span><span>{esc(review["negative"])}</span></div>')
+        if review.get('reply'):
+            parts.append(f'<button data-testid="review-pr-toggle" data-reply="{esc(review["reply"])}">Continue reading</button>')
+
+        return f'<div aria-label="Review card">{"".join(parts)}</div>'
+
+    def render_pagination(self, current_page):
+        visible_pages = [
+            n for n in range(current_page - self.PAGINATION_WINDOW, current_page + self.PAGINATION_WINDOW + 1)
+            if 1 <= n < self.num_pages
+        ]
+
+        items = []
+        for n in visible_pages + [self.num_pages]:
+            current = ' aria-current="page"' if n == current_page else ''
+            items.append(f'<li><button aria-label=" {n}" data-page="{n}"{current}>{n}</button></li>')
+        return f'<div class="ab95b25344"><ol>{"".join(items)}</ol></div>'
+
+
+class StubLLMServer(BackgroundServer):
+    """
+    Answers the Anthropic Messages and OpenAI Chat Completions endpoints used by the
+    SentimentClassifier and TranslationStage, after `latency` seconds.
+
+    Sentiment requests get one label per numbered review and translation requests
+    get the texts back tagged "[en]", in the JSON formats the clients parse. Calls
+    and prompt/answer sizes are counted per endpoint.
+    """
+
+    LABELS = ('joy', 'neutral', 'sadness', 'anger')
+
+    def __init__(self, latency=0.0):
+        super().__init__()
+        self.latency = latency
+
+    @property
+    def anthropic_base_url(self):
+        return self.base_url
+
+    @property
+    def openai_base_url(self):
+        return f'{self.base_url}/v1'
+
+    def handle(self, request):
+        length = int(request.headers.get('Content-Length') or 0)
+        body = json.loads(request.rfile.read(length) or b'{}')
+        if self.latency:
+            time.sleep(self.latency)
+
+        path = urlparse(request.path).path
+        if path == '/v1/messages':
+            self.respond(request, json.dumps(self.answer_messages(body)), content_type='application/json')
+        elif path == '/v1/chat/completions':
+            self.respond(request, json.dumps(self.answer_chat_completion(body)), content_type='application/json')
+        else:
+            self.respond(request, json.dumps({'error': 'not found'}), content_type='application/json', status=404)
+
+    def count_call(self, endpoint, prompt, answer):
+        self.increment(f'{endpoint}_calls')
+        self.increment(f'{endpoint}_prompt_chars', len(prompt))
+        self.increment(f'{endpoint}_answer_chars', len(answer))
+
+    def answer_messages(self, body):
+        prompt = body['messages'][-1]['content']
+        match = re.search(r'JSON array of (\d+)', prompt)
+        expected = int(match.group(1)) if match else 1
+        answer = json.dumps([self.LABELS[i % len(self.LABELS)] for i in range(expected)])
+        self.count_call('sentiment', prompt, answer)
+
+        return {
+            'id': 'msg_stub',
+            'type': 'message',
+            'role': 'assistant',
+            'model': body.get('model'),
+            'content': [{'type': 'text', 'text': answer}],
+            'stop_reason': 'end_turn',
+            'stop_sequence': None,
+            'usage': {'input_tokens': len(prompt) // 4, 'output_tokens': len(answer) // 4},
+        }
+
+    def answer_chat_completion(self, body):
+        prompt = body['messages'][-1]['content']
+        match = re.search(r'\n\n(\[.*\])\s*$', prompt, re.DOTALL)
+        if match:
+            answer = json.dumps([f'[en] {text}' for text in json.loads(match.group(1))], ensure_ascii=False)
+        else:
+            answer = '[en] ' + prompt.split('\n\n', 1)[-1]
+        self.count_call('translation', prompt, answer)
+
+        return {
+            'id': 'chatcmpl-stub',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model'),
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': answer}, 'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': len(prompt) // 4, 'completion_tokens': len(answer) // 4, 'total_tokens': (len(prompt) + len(answer)) // 4},
+        }
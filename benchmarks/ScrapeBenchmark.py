@@ -0,0 +1,192 @@
+"""
+Offline benchmark of the scraping and enrichment pipeline.
+
+Runs BookingComScraper.scrape_hotel_reviews against the local review fixture site,
+with sentiment (and optionally translation) going to stub LLM endpoints, and writes
+throughput, browser round-trips, LLM calls and peak memory to a JSON file.
+
+Usage (from the repository root):
+    python benchmarks/ScrapeBenchmark.py --pages 20 --llm-latency 0.3
+    python benchmarks/ScrapeBenchmark.py --translate --output benchmarks/results/baseline.json
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from playwright._impl._connection import Connection
+
+from BenchmarkServers import ReviewFixtureSite, StubLLMServer
+from BookingComScraper import BookingComScraper
+from ResultCache import ResultCache
+from ReviewFingerprints import FingerprintIndex
+from ScrapeMetrics import ScrapeMetrics
+from ScrapeProfile import ScrapeProfile
+from SelectorRegistry import SelectorRegistry
+from SentimentClassifier import SentimentClassifier
+from TranslationStage import TranslationStage
+
+RESULTS_DIR = os.path.join(REPO_ROOT, 'benchmarks', 'results')
+
+
+@contextmanager
+def count_driver_calls(calls):
+    # Every Playwright API call is one request to the browser driver, which turns it
+    # into the CDP commands; counting them per method shows how chatty extraction is
+    original = Connection._send_message_to_server
+
+    def counted(connection, channel_owner, method, *args, **kwargs):
+        calls[method] += 1
+        return original(connection, channel_owner, method, *args, **kwargs)
+
+    Connection._send_message_to_server = counted
+    try:
+        yield calls
+    finally:
+        Connection._send_message_to_server = original
+
+
+def git_version():
+    try:
+        return subprocess.run(
+            ['git', 'describe', '--always', '--dirty'], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def peak_rss_mb(who):
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(who).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def per(amount, total):
+    return round(amount / total, 3) if total else None
+
+
+async def run_benchmark(args, work_dir):
+    cache = ResultCache(path=os.path.join(work_dir, 'llm_results.sqlite'))
+    fingerprint_index = FingerprintIndex(path=os.path.join(work_dir, 'review_fingerprints.sqlite'))
+    metrics = ScrapeMetrics()
+
+    with ReviewFixtureSite(num_pages=args.pages, cards_per_page=args.cards_per_page, page_latency=args.page_latency, reply_delay_ms=args.reply_delay_ms) as site, \
+            StubLLMServer(latency=args.llm_latency) as llm:
+
+        sentiment_classifier = SentimentClassifier(api_key='benchmark', base_url=llm.anthropic_base_url, cache=cache, requests_per_minute=args.llm_rpm, metrics=metrics)
+        translator = None
+        if args.translate:
+            translator = TranslationStage(api_key='benchmark', base_url=llm.openai_base_url, cache=cache, requests_per_minute=args.llm_rpm, metrics=metrics)
+
+        scraper = BookingComScraper(
+            sentiment_classifier=sentiment_classifier,
+            cache=cache,
+            fingerprint_index=fingerprint_index,
+            metrics=metrics,
+            # the fixture site is served from localhost, so it counts as first party
+            profile=ScrapeProfile(first_party_domains=('127.0.0.1',)),
+            translator=translator,
+            include_partner_replies=not args.skip_partner_replies,
+            # the selectors that match the fixtures must not become the live run's first choices
+            selectors=SelectorRegistry(cache_path=os.path.join(work_dir, 'selector_choices.json')),
+        )
+
+        driver_calls = Counter()
+        with count_driver_calls(driver_calls):
+            start = time.perf_counter()
+            df = await scraper.scrape_hotel_reviews(
+                site.hotel_url('benchmark-hotel'),
+                hotel_id='BENCH1',
+                hotel_name='Benchmark Hotel',
+                source_name='booking.com',
+                filename=os.path.join(work_dir, 'reviews.csv'),
+                num_workers=args.workers,
+                if_exists='overwrite',
+            )
+            elapsed = time.perf_counter() - start
+
+        if isinstance(df, dict):
+            raise RuntimeError(f"Benchmark scrape failed: {df['error']}")
+
+        pages = metrics.histograms['extract_page'].count
+        cards = len(df)
+        reviews_with_text = int(df['review_text'].notna().sum())
+        llm_calls = llm.counters['sentiment_calls'] + llm.counters['translation_calls']
+        total_driver_calls = sum(driver_calls.values())
+
+        results = {
+            'elapsed_s': round(elapsed, 3),
+            'pages': pages,
+            'cards': cards,
+            'pages_per_s': per(pages, elapsed),
+            'cards_per_s': per(cards, elapsed),
+            'driver_calls': total_driver_calls,
+            'driver_calls_per_card': per(total_driver_calls, cards),
+            'llm_calls': llm_calls,
+            'llm_calls_per_review': per(llm_calls, reviews_with_text),
+            'sentiment_calls': llm.counters['sentiment_calls'],
+            'translation_calls': llm.counters['translation_calls'],
+            'partner_replies': int(df['review_feedback'].notna().sum()),
+            'peak_rss_mb': peak_rss_mb(resource.RUSAGE_SELF),
+            # largest finished child process, i.e. the browser driver once the scrape is done
+            'peak_rss_largest_child_mb': peak_rss_mb(resource.RUSAGE_CHILDREN),
+        }
+
+        report = {
+            'version': git_version(),
+            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'config': vars(args),
+            'results': results,
+            'driver_calls_by_method': dict(driver_calls.most_common()),
+            'llm_stub': dict(llm.counters),
+            'fixture_site': dict(site.counters),
+            'step_latency': metrics.summary(),
+            'counters': dict(metrics.counters),
+        }
+
+    cache.close()
+    fingerprint_index.close()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the scraper and enrichment steps against local fixtures')
+    parser.add_argument('--pages', type=int, default=10, help='review pages to scrape')
+    parser.add_argument('--cards-per-page', type=int, default=ReviewFixtureSite.CARDS_PER_PAGE)
+    parser.add_argument('--workers', type=int, default=BookingComScraper.NUM_PAGE_WORKERS, help='browser pages per hotel')
+    parser.add_argument('--page-latency', type=float, default=0.05, help='seconds before each review page is served')
+    parser.add_argument('--reply-delay-ms', type=int, default=100, help='delay before a partner reply appears after its toggle is clicked')
+    parser.add_argument('--llm-latency', type=float, default=0.2, help='seconds before each stub LLM response')
+    parser.add_argument('--llm-rpm', type=int, default=6000, help='client side request rate limit for the stub LLM')
+    parser.add_argument('--translate', action='store_true', help='run the translation stage as well')
+    parser.add_argument('--skip-partner-replies', action='store_true')
+    parser.add_argument('--output', help='JSON report path (default benchmarks/results/<git version>.json)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        report = asyncio.run(run_benchmark(args, work_dir))
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{report['version']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    print(json.dumps(report['results'], indent=2))
+    print(f'Benchmark report written to {output}')
+
+
+if __name__ == '__main__':
+    main()